@@ -0,0 +1,78 @@
+"""
+Before/after timing for ModeMixin._apply_mode.
+
+Compares the original full-frame white overlay + cv2.addWeighted
+implementation with the LUT compositor, and checks that both produce
+identical pixels for every mode.
+
+Usage: python benchmarks/bench_apply_mode.py [--frames N] [--size WxH]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vpism.logic.camera_wrapper import ModeMixin, VignetteCompositor  # noqa: E402
+
+
+def legacy_apply_mode(mixin, frame, roi_ratio=0.8, alpha=0.7):
+    """The pre-compositor implementation, kept here as the reference."""
+    h, w = frame.shape[:2]
+    roi_size = int(min(h, w) * roi_ratio)
+    x1 = (w - roi_size) // 2
+    y1 = (h - roi_size) // 2
+    x2 = x1 + roi_size
+    y2 = y1 + roi_size
+
+    white_bg = np.ones_like(frame, dtype=np.uint8) * 255
+    output = cv2.addWeighted(frame, 1 - alpha, white_bg, alpha, 0)
+    roi = frame[y1:y2, x1:x2]
+
+    mode = mixin.current_mode
+    if mode == "inverted":
+        processed_roi = cv2.bitwise_not(roi)
+    elif mode == "vein":
+        processed_roi = mixin._apply_vein_detection(roi)
+    else:
+        processed_roi = roi
+    output[y1:y2, x1:x2] = processed_roi
+    return output
+
+
+def time_it(fn, frame, frames):
+    fn(frame)  # warm up caches / LUTs
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn(frame)
+    return (time.perf_counter() - start) / frames * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--size", default="640x480")
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    frame = np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+    print(f"{'mode':<10}{'blend':<10}{'before ms':>12}{'after ms':>12}{'speedup':>10}  exact")
+    for mode in ModeMixin.modes:
+        for method in VignetteCompositor.methods:
+            mixin = ModeMixin(mode)
+            mixin.blend_method = method
+            exact = np.array_equal(legacy_apply_mode(mixin, frame), mixin._apply_mode(frame))
+            before = time_it(lambda f: legacy_apply_mode(mixin, f), frame, args.frames)
+            after = time_it(mixin._apply_mode, frame, args.frames)
+            print(
+                f"{mode:<10}{method:<10}{before:>12.3f}{after:>12.3f}"
+                f"{before / after:>9.2f}x  {exact}"
+            )
+
+
+if __name__ == "__main__":
+    main()
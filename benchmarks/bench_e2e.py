@@ -0,0 +1,200 @@
+"""
+End-to-end benchmark of MainWindow + VideoThread under offscreen Qt.
+
+Starts the real MainWindow on a replay source and, for every combination
+of mode, zoom and rotation, shows a fixed number of frames and reports:
+
+    fps       frames painted per second
+    p50/p95/p99  capture-to-display latency (camera capture -> setPixmap)
+    dropped   frames rendered for display but replaced before the GUI
+              took them (the mailbox), and frames captured but never shown
+
+Exits non-zero when a run is over budget (--min-fps, --max-p95, --max-p99,
+--max-drop-rate).
+
+The default source is a short raw recording made from test.png, shifted a
+little every frame; --source accepts any VPISM_SOURCE spec, e.g.
+video:clip.mp4 or picamera2:fake.
+
+Usage: python benchmarks/bench_e2e.py [--frames N] [--fps FPS] [--source SPEC]
+       [--min-fps F] [--max-p95 MS] [--max-p99 MS] [--max-drop-rate R] [--output FILE]
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from PyQt5.QtCore import QEventLoop, QTimer  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+from vpism.logic.camera_wrapper import ModeMixin  # noqa: E402
+from vpism.logic.frame_stats import LatencyTracker  # noqa: E402
+
+ZOOMS = (1.0, 2.0)
+ROTATIONS = (0, 180)
+
+
+def make_recording(path, image_path, size, frames=60):
+    """A .npy recording of the image, panning a few pixels per frame."""
+    image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if image is None:
+        sys.exit(f"Cannot read {image_path}")
+    image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+    recording = np.empty((frames,) + image.shape, dtype=np.uint8)
+    for i in range(frames):
+        recording[i] = np.roll(image, i * 4, axis=1)
+    np.save(path, recording)
+
+
+def show_frames(app, window, count, timeout):
+    """Run the event loop until count frames were painted; returns the count."""
+    painted = [0]
+    loop = QEventLoop()
+    update_image = type(window).update_image
+
+    def counted(qt_img):
+        update_image(window, qt_img)
+        painted[0] += 1
+        if painted[0] >= count:
+            loop.quit()
+
+    window.update_image = counted
+    QTimer.singleShot(int(timeout * 1000), loop.quit)
+    loop.exec_()
+    del window.update_image
+    return painted[0]
+
+
+def set_view(window, mode, zoom, rotation):
+    thread = window.video_thread
+    while thread.camera.current_mode != mode:
+        thread.switch_mode()
+    if window.zoom_factor != zoom:
+        window.zoom_image()
+    if window.rotation_angle != rotation:
+        window.rotate_image()
+
+
+def run(app, window, mode, zoom, rotation, args):
+    thread = window.video_thread
+    set_view(window, mode, zoom, rotation)
+    timeout = args.frames / (args.fps or 30) * 3 + 5
+    show_frames(app, window, args.warmup, timeout)  # flush frames of the old view
+
+    thread.latency = LatencyTracker(window=args.frames)
+    dropped = thread.dropped_frames
+    captured = thread.pipeline.captured
+    start = time.perf_counter()
+    painted = show_frames(app, window, args.frames, timeout)
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = thread.latency.percentiles(50, 95, 99)
+    captured = thread.pipeline.captured - captured
+    return {
+        "mode": mode, "zoom": zoom, "rotation": rotation,
+        "frames": painted,
+        "fps": painted / elapsed if elapsed else 0.0,
+        "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+        "dropped": thread.dropped_frames - dropped,
+        "not_shown": max(0, captured - painted),
+        "captured": captured,
+    }
+
+
+def over_budget(result, args):
+    problems = []
+    if result["frames"] < args.frames:
+        problems.append(f"only {result['frames']}/{args.frames} frames shown")
+    if args.min_fps and result["fps"] < args.min_fps:
+        problems.append(f"fps {result['fps']:.1f} < {args.min_fps}")
+    if result["p95_ms"] is not None and result["p95_ms"] > args.max_p95:
+        problems.append(f"p95 {result['p95_ms']:.1f} ms > {args.max_p95}")
+    if result["p99_ms"] is not None and result["p99_ms"] > args.max_p99:
+        problems.append(f"p99 {result['p99_ms']:.1f} ms > {args.max_p99}")
+    drop_rate = result["not_shown"] / max(1, result["captured"])
+    if drop_rate > args.max_drop_rate:
+        problems.append(f"drop rate {drop_rate:.1%} > {args.max_drop_rate:.0%}")
+    return problems
+
+
+def benchmark(args, workdir):
+    source = args.source
+    if source is None:
+        w, h = (int(v) for v in args.size.lower().split("x"))
+        recording = os.path.join(workdir, "recording.npy")
+        make_recording(recording, os.path.join(REPO, "test.png"), (w, h))
+        source = f"raw:{recording}"
+    os.environ["VPISM_SOURCE"] = source
+    os.environ["VPISM_REPLAY_FPS"] = str(args.fps)
+    os.environ["VPISM_REPLAY_LOOP"] = "1"
+    # Keep rotate_image() from touching the device's saved orientation
+    os.environ["VPISM_STATE_FILE"] = os.path.join(workdir, "state.json")
+    os.environ.setdefault("VPISM_METRICS_PORT", "0")
+
+    from main import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    app.processEvents()
+
+    print(f"source {source} at {args.fps:g} fps, {args.frames} frames per run")
+    print(f"{'mode':<10}{'zoom':>5}{'rot':>5}{'fps':>8}{'p50':>8}{'p95':>8}{'p99':>8}"
+          f"{'dropped':>9}{'unshown':>9}")
+    results = []
+    failures = 0
+    for mode, zoom, rotation in itertools.product(ModeMixin.modes, ZOOMS, ROTATIONS):
+        result = run(app, window, mode, zoom, rotation, args)
+        result["problems"] = over_budget(result, args)
+        results.append(result)
+        failures += bool(result["problems"])
+        ms = [f"{v:>8.1f}" if v is not None else f"{'-':>8}"
+              for v in (result["p50_ms"], result["p95_ms"], result["p99_ms"])]
+        print(f"{mode:<10}{zoom:>5g}{rotation:>5}{result['fps']:>8.1f}{''.join(ms)}"
+              f"{result['dropped']:>9}{result['not_shown']:>9}"
+              + ("  OVER BUDGET: " + "; ".join(result["problems"]) if result["problems"] else ""))
+
+    window.close()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"source": source, "fps": args.fps, "frames": args.frames,
+                       "results": results}, f, indent=2)
+    return failures
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=150, help="frames per combination")
+    parser.add_argument("--warmup", type=int, default=15)
+    parser.add_argument("--fps", type=float, default=30.0, help="replay rate (0: unpaced)")
+    parser.add_argument("--source", help="VPISM_SOURCE spec (default: recording of test.png)")
+    parser.add_argument("--size", default="640x480", help="size of the default recording")
+    parser.add_argument("--min-fps", type=float, help="default: 90%% of --fps")
+    parser.add_argument("--max-p95", type=float, default=50.0, help="ms")
+    parser.add_argument("--max-p99", type=float, default=100.0, help="ms")
+    parser.add_argument("--max-drop-rate", type=float, default=0.05)
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+    if args.min_fps is None:
+        args.min_fps = 0.9 * args.fps
+
+    workdir = tempfile.mkdtemp(prefix="vpism-bench-")
+    try:
+        failures = benchmark(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
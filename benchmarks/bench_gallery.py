@@ -0,0 +1,128 @@
+"""
+Benchmark opening the saved-images gallery (ShowFilesDialog).
+
+Fills two day folders with --count camera-sized images, then measures
+under offscreen Qt:
+  - the old synchronous load (full QPixmap decode + scale per file),
+  - how long load_images() blocks the GUI thread,
+  - time until the visible thumbnails and all thumbnails are in,
+  - switching dates mid-load: no thumbnail of the old date may land.
+
+Exits non-zero if load_images() blocks longer than --budget-ms or the
+date switch lets a stale thumbnail through.
+
+Usage: python benchmarks/bench_gallery.py [--count N] [--size WxH] [--format jpg|png]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from PyQt5.QtCore import Qt  # noqa: E402
+from PyQt5.QtGui import QIcon, QPixmap  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+
+def fill(day_dir, count, size, ext):
+    os.makedirs(day_dir)
+    w, h = size
+    rng = np.random.default_rng(0)
+    base = cv2.resize(rng.integers(0, 256, (h // 8, w // 8, 3), dtype=np.uint8), (w, h))
+    for i in range(1, count + 1):
+        cv2.imwrite(os.path.join(day_dir, f"image_{i}.{ext}"), np.roll(base, i, axis=1))
+
+
+def old_load(day_dir):
+    started = time.perf_counter()
+    for name in sorted(os.listdir(day_dir)):
+        pixmap = QPixmap(os.path.join(day_dir, name))
+        QIcon(pixmap.scaled(100, 100, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+    return (time.perf_counter() - started) * 1000
+
+
+def wait_for(app, condition, timeout=120):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--format", default="jpg")
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vpism-gallery-")
+    try:
+        size = tuple(int(v) for v in args.size.lower().split("x"))
+        os.environ["VPISM_SAVE_DIR"] = workdir
+        for day in ("2024-01-01", "2024-01-02"):
+            fill(os.path.join(workdir, day), args.count, size, args.format)
+
+        from vpism.gui.show_files_dialog import ShowFilesDialog
+
+        app = QApplication.instance() or QApplication(sys.argv)
+        old_ms = old_load(os.path.join(workdir, "2024-01-01"))
+
+        # The constructor loads the newest date (2024-01-02)
+        dlg = ShowFilesDialog()
+        dlg.loader.cancel()
+        dlg.show()
+        app.processEvents()
+
+        placeholder_key = dlg.placeholder.cacheKey()
+        applied = []
+        # Direct connection: recorded in the worker at the moment of emission
+        dlg.loader.loaded.connect(lambda gen, key, image: applied.append((gen, time.perf_counter())),
+                                  Qt.DirectConnection)
+
+        started = time.perf_counter()
+        dlg.load_images("2024-01-02")
+        block_ms = (time.perf_counter() - started) * 1000
+        generation = dlg.loader.generation
+        visible = dlg.visible_keys()
+        wait_for(app, lambda: all(dlg.items[k].icon().cacheKey() != placeholder_key for k in visible))
+        visible_ms = (time.perf_counter() - started) * 1000
+        wait_for(app, lambda: sum(g == generation for g, _ in applied) == len(dlg.items))
+        all_ms = (time.perf_counter() - started) * 1000
+
+        # Switch date while the first one is still loading
+        applied.clear()
+        dlg.date_box.setCurrentText("2024-01-01")
+        old_generation = dlg.loader.generation
+        wait_for(app, lambda: len(applied) >= 2)
+        switched_at = time.perf_counter()
+        dlg.date_box.setCurrentText("2024-01-02")  # load_images via currentTextChanged
+        wait_for(app, lambda: dlg.load_started is None)
+        time.sleep(0.2)  # let decodes of the old date that were in flight finish
+        app.processEvents()
+        stale = sum(g == old_generation and t > switched_at for g, t in applied)
+        landed = all(dlg.items[k].icon().cacheKey() != placeholder_key for k in dlg.items)
+        count = len(dlg.items)
+        dlg.close()
+
+        ok = block_ms < args.budget_ms and landed and stale == 0 and count == args.count
+        print(f"{args.count} x {args.size} {args.format}: old synchronous load {old_ms:8.1f} ms")
+        print(f"load_images() blocks {block_ms:6.1f} ms  visible thumbnails ({len(visible)}) "
+              f"{visible_ms:7.1f} ms  all {all_ms:7.1f} ms")
+        print(f"date switch mid-load: old-date results after switch {stale}  "
+              f"all new thumbnails in {landed}  {'OK' if ok else 'FAIL'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
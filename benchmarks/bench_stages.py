@@ -0,0 +1,235 @@
+"""
+Per-stage timings of the frame path, across resolutions and modes.
+
+Times each stage on its own, for 480p/720p/1080p and every mode in
+ModeMixin.modes:
+
+    camera side   vignette blend, ROI copy (normal), bitwise_not (inverted),
+                  vein enhancement per CLAHE iteration count, whole _apply_mode
+    display side  display transform (rotation/zoom), QImage wrap and the
+                  whole VideoThread.to_image, QPixmap.fromImage
+                  (MainWindow.update_image) and the still-image crop/scale
+                  of MainWindow.apply_zoom
+
+Vein mode is fed the luma (grayscale) frame Picamera2 delivers unless
+--vein-input bgr. Results are written as JSON (stdout by default) so runs
+can be compared across releases and devices; a table goes to stderr.
+--compare OLD.json prints (to stderr) the ratio of each median to an
+earlier run.
+
+Usage: python benchmarks/bench_stages.py [--frames N] [--sizes 480p,720p,1080p]
+       [--iterations 1,2,5] [--display WxH] [--output FILE] [--compare OLD.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from PyQt5.QtCore import QT_VERSION_STR, Qt  # noqa: E402
+from PyQt5.QtGui import QImage, QPixmap  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vpism.logic.camera_wrapper import CameraInterface, ModeMixin, VignetteCompositor  # noqa: E402
+from vpism.logic.display_transform import output_shape, transform_frame  # noqa: E402
+from vpism.logic.video_thread import VideoThread  # noqa: E402
+
+RESOLUTIONS = {"480p": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080)}
+# (rotation, zoom) still done in software: a held frame, or no ISP support
+DISPLAY_VIEWS = [(0, 1.0), (180, 1.0), (0, 2.0)]
+
+
+class StillCamera(ModeMixin, CameraInterface):
+    """Just enough of a camera for VideoThread.to_image."""
+
+    def capture(self, out=None):
+        return False, None
+
+    def release(self):
+        pass
+
+
+def time_stage(fn, frames, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    last = len(samples) - 1
+    return {
+        "mean": sum(samples) / len(samples),
+        "median": samples[last // 2],
+        "p95": samples[int(round(0.95 * last))],
+        "min": samples[0],
+    }
+
+
+def load_frame(path, size):
+    image = cv2.imread(path, cv2.IMREAD_COLOR) if path else None
+    if image is None:
+        image = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    return cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+
+
+def camera_stages(frame, mode, iterations, roi_ratio=0.8, alpha=0.7):
+    """(stage, params, fn) for ModeMixin._apply_mode and its parts."""
+    mixin = ModeMixin(mode)
+    compositor = VignetteCompositor(frame.shape, roi_ratio, alpha, mixin.blend_method)
+    out = np.empty_like(frame)
+    roi = compositor.roi(frame)
+    roi_out = compositor.roi(out)
+
+    stages = [("blend", {"method": mixin.blend_method}, lambda: compositor.blend(frame, out))]
+    if mode == "normal":
+        stages.append(("roi_copy", {}, lambda: np.copyto(roi_out, roi)))
+    elif mode == "inverted":
+        stages.append(("bitwise_not", {}, lambda: cv2.bitwise_not(roi, dst=roi_out)))
+    else:
+        for n in iterations:
+            stages.append((
+                "vein", {"iterations": n},
+                lambda n=n: mixin._apply_vein_detection(roi, clahe_iterations=n, out=roi_out),
+            ))
+    stages.append(("apply_mode", {}, lambda: mixin._apply_mode(frame, roi_ratio, alpha, out=out)))
+    return stages, mixin._apply_mode(frame, roi_ratio, alpha)
+
+
+def display_stages(frame, display_size):
+    """(stage, params, fn) for the display conversion and painting."""
+    stages = []
+    for rotation, zoom in DISPLAY_VIEWS:
+        out = np.empty(output_shape(frame.shape, display_size, zoom), dtype=np.uint8)
+        stages.append((
+            "display_transform", {"rotation": rotation, "zoom": zoom},
+            lambda r=rotation, z=zoom, o=out: transform_frame(frame, display_size, r, z, out=o),
+        ))
+
+    thread = VideoThread(camera=StillCamera())
+    thread.set_display(size=display_size)
+    buffer = transform_frame(frame, display_size)
+    buffer = np.ascontiguousarray(buffer)
+    if buffer.ndim == 2:
+        fmt = QImage.Format_Grayscale8
+    else:
+        fmt = QImage.Format_RGB32 if buffer.shape[2] == 4 else QImage.Format_BGR888
+    h, w = buffer.shape[:2]
+    image = QImage(buffer.data, w, h, buffer.strides[0], fmt)
+
+    def to_image():
+        thread.to_image(frame).release()
+
+    still = QPixmap.fromImage(QImage(frame.data, frame.shape[1], frame.shape[0],
+                                     frame.strides[0], fmt).copy())
+
+    def apply_zoom(zoom=2.0):
+        crop_w, crop_h = int(still.width() / zoom), int(still.height() / zoom)
+        cropped = still.copy((still.width() - crop_w) // 2, (still.height() - crop_h) // 2,
+                             crop_w, crop_h)
+        cropped.scaled(*display_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    stages += [
+        ("qimage_wrap", {}, lambda: QImage(buffer.data, w, h, buffer.strides[0], fmt)),
+        ("to_image", {}, to_image),
+        ("qpixmap_from_image", {}, lambda: QPixmap.fromImage(image)),
+        ("apply_zoom_still", {"zoom": 2.0}, apply_zoom),
+    ]
+    return stages
+
+
+def metadata(args):
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "qt": QT_VERSION_STR,
+        "cpus": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+        "frames": args.frames,
+        "display": list(args.display),
+        "vein_input": args.vein_input,
+    }
+
+
+def result_key(result):
+    return (result["resolution"], result["mode"], result["stage"],
+            json.dumps(result["params"], sort_keys=True))
+
+
+def compare(results, path):
+    with open(path) as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    print(f"{'resolution':<8}{'mode':<10}{'stage':<36}{'old ms':>9}{'new ms':>9}{'ratio':>8}",
+          file=sys.stderr)
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old is None:
+            continue
+        stage = result["stage"] + "".join(f" {k}={v}" for k, v in result["params"].items())
+        before, after = old["ms"]["median"], result["ms"]["median"]
+        print(f"{result['resolution']:<8}{result['mode']:<10}{stage:<36}"
+              f"{before:>9.3f}{after:>9.3f}{after / before if before else 0:>7.2f}x",
+              file=sys.stderr)
+
+
+def main():
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--sizes", default="480p,720p,1080p")
+    parser.add_argument("--iterations", default="1,2,3,5", help="CLAHE iteration counts")
+    parser.add_argument("--display", default="800x480", help="display area (WxH)")
+    parser.add_argument("--image", default=os.path.join(repo, "test.png"))
+    parser.add_argument("--vein-input", choices=("luma", "bgr"), default="luma")
+    parser.add_argument("--output", default="-", help="JSON file ('-' for stdout)")
+    parser.add_argument("--compare", help="earlier JSON output to compare against")
+    args = parser.parse_args()
+    args.display = tuple(int(v) for v in args.display.lower().split("x"))
+    iterations = [int(n) for n in args.iterations.split(",")]
+
+    app = QApplication.instance() or QApplication(sys.argv)  # noqa: F841
+    results = []
+    for name in args.sizes.split(","):
+        size = RESOLUTIONS[name]
+        bgr = load_frame(args.image, size)
+        for mode in ModeMixin.modes:
+            frame = bgr
+            if mode == "vein" and args.vein_input == "luma":
+                frame = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+            stages, processed = camera_stages(frame, mode, iterations)
+            stages += display_stages(processed, args.display)
+            for stage, params, fn in stages:
+                ms = time_stage(fn, args.frames)
+                results.append({
+                    "resolution": name, "size": list(size), "mode": mode,
+                    "stage": stage, "params": params, "ms": ms,
+                })
+                label = stage + "".join(f" {k}={v}" for k, v in params.items())
+                print(f"{name:<7}{mode:<10}{label:<36}{ms['median']:>9.3f} ms "
+                      f"(p95 {ms['p95']:.3f})", file=sys.stderr)
+
+    report = {"meta": metadata(args), "results": results}
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Speed/quality sweep for the vein-mode enhancer.
+
+For each configuration, times VeinEnhancer.apply on the grayscale ROI and
+reports SSIM against the original 5x CLAHE(2.0, 8x8) output, so a
+speed/quality point can be picked per device.
+
+Usage: python benchmarks/bench_vein.py [--image test.png] [--size WxH] [--frames N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vpism.logic.vein_enhancer import VeinEnhancer, reference_clahe, ssim  # noqa: E402
+
+CONFIGS = [
+    # (label, configure kwargs, calibrate tone curve)
+    ("5x clip2 8x8 (reference)", dict(iterations=5), False),
+    ("4x clip2 8x8", dict(iterations=4), False),
+    ("3x clip2 8x8", dict(iterations=3), False),
+    ("2x clip2 8x8", dict(iterations=2), False),
+    ("1x clip2 8x8", dict(iterations=1), False),
+    ("1x clip4 8x8", dict(iterations=1, clip_limit=4.0), False),
+    ("1x clip8 8x8", dict(iterations=1, clip_limit=8.0), False),
+    ("1x clip16 8x8", dict(iterations=1, clip_limit=16.0), False),
+    ("1x clip40 8x8", dict(iterations=1, clip_limit=40.0), False),
+    ("1x clip6 4x4", dict(iterations=1, clip_limit=6.0, tile_grid=(4, 4)), False),
+    ("1x clip2 8x8 + tone curve", dict(iterations=1), True),
+    ("1x clip16 8x8 + tone curve", dict(iterations=1, clip_limit=16.0), True),
+    ("2x clip4 8x8 + tone curve", dict(iterations=2, clip_limit=4.0), True),
+]
+
+
+def main():
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", default=os.path.join(repo, "test.png"))
+    parser.add_argument("--size", default="384x384", help="ROI size (default: 0.8 * 480)")
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        sys.exit(f"Cannot read {args.image}")
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    gray = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+    reference = reference_clahe(gray)
+
+    print(f"{'config':<28}{'ms/frame':>10}{'ssim':>8}")
+    for label, kwargs, tone_curve in CONFIGS:
+        enhancer = VeinEnhancer()
+        enhancer.configure(**kwargs)
+        if tone_curve:
+            enhancer.calibrate(gray, iterations=kwargs["iterations"])
+        out = enhancer.apply(gray)
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            enhancer.apply(gray)
+        ms = (time.perf_counter() - start) / args.frames * 1000.0
+        print(f"{label:<28}{ms:>10.3f}{ssim(out, reference):>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Check that the frame path does not allocate frame buffers in steady state.
+
+Runs VideoThread (capture -> processing -> display transform -> QImage)
+on a synthetic camera that copies into the buffer it is given, consumes
+frames the way MainWindow does, and uses tracemalloc to verify that no
+frame-sized allocation happens after warm-up. Exits non-zero on failure.
+
+Usage: python benchmarks/check_allocations.py [--frames N] [--size WxH]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vpism.logic.camera_wrapper import CameraInterface, ModeMixin  # noqa: E402
+from vpism.logic.video_thread import VideoThread  # noqa: E402
+
+
+class SyntheticCamera(ModeMixin, CameraInterface):
+    def __init__(self, shape, mode="normal"):
+        ModeMixin.__init__(self, mode)
+        self.frame = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+    def capture(self, out=None):
+        time.sleep(0.002)
+        if out is None:
+            return True, self.frame.copy()
+        out[...] = self.frame
+        return True, out
+
+    def release(self):
+        pass
+
+
+def consume(thread, frames):
+    shown = 0
+    while shown < frames:
+        frame = thread.take_frame()
+        if frame is None:
+            time.sleep(0.001)
+            continue
+        frame.release()
+        shown += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--size", default="640x480")
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    failed = False
+    for mode in ModeMixin.modes:
+        for rotation, zoom in ((0, 1.0), (180, 2.0)):
+            camera = SyntheticCamera((h, w, 3), mode)
+            thread = VideoThread(camera=camera, workers=2)
+            thread.set_display(size=(725, 434), rotation=rotation, zoom=zoom)
+            thread.start()
+            consume(thread, 100)  # warm up pools, LUTs, scratch buffers
+
+            tracemalloc.start()
+            allocated = thread.pool.allocated
+            baseline, _ = tracemalloc.get_traced_memory()
+            consume(thread, args.frames)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            thread.stop()
+
+            # Anything close to a frame in size would show up in the peak
+            growth = peak - baseline
+            ok = growth < (w * h) // 4 and thread.pool.allocated == allocated
+            failed |= not ok
+            print(
+                f"{mode:<9} rot={rotation:<3} zoom={zoom:<3} peak growth={growth:>8} B "
+                f"pool buffers={allocated}->{thread.pool.allocated:<3} {'OK' if ok else 'FAIL'}"
+            )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Check that MainWindow buttons respond without waiting for the buzzer.
+
+Clicks the buttons whose action stays in the main window (zoom, rotate,
+mode, play/pause) under offscreen Qt, tapping rapidly, and checks that
+every click returns within the budget and that beep() itself returns at
+once. Exits non-zero on failure.
+
+Usage: python benchmarks/check_button_response.py [--taps N] [--budget-ms MS]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+BUTTONS = ("scale_button", "rotate_button", "viens_button", "play_pause_button")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--taps", type=int, default=20, help="taps per button")
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vpism-buttons-")
+    os.environ.setdefault("VPISM_SOURCE", f"image:{os.path.join(REPO, 'test.png')}")
+    os.environ["VPISM_STATE_FILE"] = os.path.join(workdir, "state.json")
+    os.environ.setdefault("VPISM_METRICS_PORT", "0")
+
+    from main import MainWindow
+    from vpism.logic import buzzer_api
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    app.processEvents()
+
+    failed = False
+    for name in BUTTONS:
+        button = getattr(window, name)
+        clicks = []
+        first = len(buzzer_api.service.history)
+        for _ in range(args.taps):
+            start = time.perf_counter()
+            button.click()
+            clicks.append((time.perf_counter() - start) * 1000.0)
+            app.processEvents()
+        buzzer_api.service.wait_idle(timeout=5)
+        beeps = list(buzzer_api.service.history)[first:]
+        beep_ms = max((r.returned_at - r.requested_at) * 1000.0 for r in beeps)
+        ok = max(clicks) < args.budget_ms and beep_ms < args.budget_ms
+        failed |= not ok
+        print(f"{name:<20} click max {max(clicks):6.2f} ms  beep() max {beep_ms:6.3f} ms  "
+              f"played {sum(r.outcome == 'played' for r in beeps):>2}/{len(beeps)}  "
+              f"{'OK' if ok else 'FAIL'}")
+
+    window.close()
+    buzzer_api.service.stop()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Check the sysfs PWM backend against a fake /sys/class/pwm tree.
+
+Builds pwmchip0 in a temp dir (with a thread standing in for the kernel
+on export), drives SysfsPwm through start/duty/frequency/stop/close and
+checks what lands in the files, including that duty_cycle never exceeds
+period. Also checks that open_pwm() picks sysfs from the environment and
+falls back when the chip is missing. Exits non-zero on failure.
+
+Usage: python benchmarks/check_pwm_sysfs.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from vpism.logic import pwm  # noqa: E402
+
+CHANNEL_FILES = ("enable", "period", "duty_cycle")
+
+
+def make_chip(root, chip=0):
+    chip_path = os.path.join(root, f"pwmchip{chip}")
+    os.makedirs(chip_path)
+    for name in ("export", "unexport"):
+        open(os.path.join(chip_path, name), "w").close()
+    return chip_path
+
+
+def make_channel(chip_path, channel):
+    path = os.path.join(chip_path, f"pwm{channel}")
+    os.makedirs(path)
+    for name in CHANNEL_FILES:
+        with open(os.path.join(path, name), "w") as f:
+            f.write("0")
+    return path
+
+
+class FakeKernel(threading.Thread):
+    """Creates pwmN when N is written to export, removes it on unexport."""
+
+    def __init__(self, chip_path):
+        super().__init__(daemon=True)
+        self.chip_path = chip_path
+        self.running = True
+
+    def _take(self, name):
+        path = os.path.join(self.chip_path, name)
+        with open(path) as f:
+            value = f.read().strip()
+        if value:
+            open(path, "w").close()
+        return value
+
+    def run(self):
+        while self.running:
+            channel = self._take("export")
+            if channel:
+                time.sleep(0.02)  # udev lag
+                make_channel(self.chip_path, channel)
+            channel = self._take("unexport")
+            if channel:
+                shutil.rmtree(os.path.join(self.chip_path, f"pwm{channel}"))
+            time.sleep(0.005)
+
+
+class Recorder:
+    """Wraps SysfsPwm._write to check duty_cycle <= period after each write."""
+
+    def __init__(self, device):
+        self.device = device
+        self.violations = []
+        self._write = device._write
+        device._write = self.write
+
+    def read(self, name):
+        with open(os.path.join(self.device.path, name)) as f:
+            return int(f.read())
+
+    def write(self, name, value):
+        self._write(name, value)
+        if self.read("duty_cycle") > self.read("period"):
+            self.violations.append((name, value))
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="vpism-pwm-")
+    failures = []
+
+    def check(label, got, expected):
+        ok = got == expected
+        if not ok:
+            failures.append(label)
+        print(f"{label:<40} {got!s:>12}  {'OK' if ok else f'FAIL (expected {expected})'}")
+
+    try:
+        chip_path = make_chip(root)
+        make_channel(chip_path, 0)
+
+        # Pre-exported channel: used as is and left exported
+        led = pwm.SysfsPwm(0, 0, frequency=1000, root=root)
+        rec = Recorder(led)
+        led.start(25)
+        check("period @ 1 kHz", rec.read("period"), 1_000_000)
+        check("duty_cycle @ 25%", rec.read("duty_cycle"), 250_000)
+        check("enable after start", rec.read("enable"), 1)
+        led.set_duty(100)
+        led.set_frequency(4000)  # shorter period: duty must shrink first
+        check("period @ 4 kHz", rec.read("period"), 250_000)
+        check("duty_cycle @ 100% 4 kHz", rec.read("duty_cycle"), 250_000)
+        led.set_frequency(500)
+        check("duty_cycle @ 100% 500 Hz", rec.read("duty_cycle"), 2_000_000)
+        check("duty_cycle > period writes", len(rec.violations), 0)
+        led.close()
+        check("enable after close", rec.read("enable"), 0)
+        check("pre-exported channel kept", os.path.isdir(led.path), True)
+
+        # Channel exported on open and unexported on close
+        kernel = FakeKernel(chip_path)
+        kernel.start()
+        buzzer = pwm.SysfsPwm(0, 1, frequency=2000, root=root)
+        check("channel 1 exported", os.path.isdir(buzzer.path), True)
+        buzzer.start(50)
+        check("channel 1 duty_cycle", Recorder(buzzer).read("duty_cycle"), 250_000)
+        buzzer.close()
+        deadline = time.monotonic() + 1.0
+        while os.path.isdir(buzzer.path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        check("channel 1 unexported", os.path.isdir(buzzer.path), False)
+        kernel.running = False
+
+        # open_pwm() from the environment
+        os.environ["VPISM_PWM_SYSFS_ROOT"] = root
+        os.environ["VPISM_LED_PWM"] = "0:0"
+        check("open_pwm led", type(pwm.open_pwm("led", pin=18)).__name__, "SysfsPwm")
+        os.environ["VPISM_LED_PWM"] = "7:0"
+        fallback = type(pwm.open_pwm("led", pin=18)).__name__
+        check("open_pwm missing chip falls back", fallback != "SysfsPwm", True)
+        del os.environ["VPISM_LED_PWM"]
+        check("open_pwm buzzer unconfigured", type(pwm.open_pwm("buzzer", pin=23)).__name__,
+              "GpioPwm" if pwm.GPIO is not None else "SimulatedPwm")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Check that a tap on save returns within a frame and writes the full
+resolution processed frame.
+
+Runs MainWindow offscreen on a generated camera-sized scene, pauses,
+taps save repeatedly and waits for the image writer. Fails if the
+--percentile tap time exceeds --budget-ms, if any tap exceeds --max-ms,
+if a save fails, or if a saved image does not have the camera frame's
+size. Exits non-zero on failure.
+
+Single taps are at the mercy of the scheduler: over 6 runs of 20 taps
+on a single-core x86 VM the median was about 4 ms, p90 at most 12 ms and
+single taps reached 16-18 ms. Hence p90 against half a 30 fps frame,
+and a worst-tap ceiling with headroom (50 ms) that still catches a tap
+blocking on the encode (hundreds of ms).
+
+Usage: python benchmarks/check_save_latency.py [--taps N] [--budget-ms MS] [--percentile P]
+                                               [--max-ms MS] [--size WxH]
+                                               [--format png|jpeg|webp]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--taps", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=16.0,
+                        help="for the --percentile tap (half a 30 fps frame)")
+    parser.add_argument("--percentile", type=float, default=90.0)
+    parser.add_argument("--max-ms", type=float, default=50.0, help="for the slowest tap")
+    parser.add_argument("--size", default="1920x1080", help="camera frame size")
+    parser.add_argument("--format", default="png")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vpism-save-")
+    try:
+        w, h = (int(v) for v in args.size.lower().split("x"))
+        scene = os.path.join(workdir, "scene.png")
+        cv2.imwrite(scene, np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8))
+        os.environ["VPISM_SOURCE"] = f"image:{scene}"
+        os.environ["VPISM_STATE_FILE"] = os.path.join(workdir, "state.json")
+        os.environ["VPISM_SAVE_DIR"] = os.path.join(workdir, "saved_images")
+        os.environ["VPISM_SAVE_FORMAT"] = args.format
+        os.environ["VPISM_SAVE_QUEUE"] = str(args.taps)
+        os.environ.setdefault("VPISM_METRICS_PORT", "0")
+        os.environ.setdefault("VPISM_STALL_MS", "0")  # wait_idle() blocks the GUI on purpose
+
+        from main import MainWindow
+
+        app = QApplication.instance() or QApplication(sys.argv)
+        window = MainWindow()
+        window.show()
+        deadline = time.monotonic() + 5
+        while window.video_thread.last_frame is None and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        window.play_pause_button.click()
+        app.processEvents()
+
+        taps = []
+        for _ in range(args.taps):
+            start = time.perf_counter()
+            window.save_showfiles_button.click()
+            taps.append((time.perf_counter() - start) * 1000.0)
+            app.processEvents()
+        window.image_writer.wait_idle(timeout=30)
+        app.processEvents()
+
+        requests = list(window.image_writer.history)
+        sizes = {cv2.imread(path).shape[1::-1] for r in requests for path in r.paths}
+        write_ms = [(r.finished_at - r.requested_at) * 1000.0 for r in requests if r.finished_at]
+        saved = sum(r.outcome == "saved" for r in requests)
+        window.close()
+
+        print("taps ms:", " ".join(f"{t:.1f}" for t in taps))
+        ordered = sorted(taps)
+        tap_p = ordered[min(len(ordered) - 1, int(round(args.percentile / 100 * (len(ordered) - 1))))]
+        ok = (tap_p < args.budget_ms and max(taps) < args.max_ms
+              and saved == args.taps and sizes == {(w, h)})
+        print(f"tap p{args.percentile:g} {tap_p:6.2f} ms  max {max(taps):6.2f} ms  "
+              f"saved {saved}/{args.taps}  "
+              f"tap-to-written max {max(write_ms, default=0):7.1f} ms  sizes {sorted(sizes)}  "
+              f"{'OK' if ok else 'FAIL'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Check the saved-image storage layer (vpism/logic/storage.py).
+
+- Crash recovery: builds a day folder as an unclean shutdown could leave
+  it (truncated files, temp files, a gap past the durable mark) and
+  checks what the store makes of it.
+- Numbering: compares the cost of picking a file name in a folder of
+  --files images with the old probe-from-image_1 loop.
+- fsync policies: times --saves writes of a --kb KB file per policy in
+  --dir (run it on the SD card to see real numbers; tmpfs fsyncs are free).
+
+Exits non-zero if a recovery check fails.
+
+Usage: python benchmarks/check_storage.py [--files N] [--saves N] [--kb KB] [--dir PATH]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from vpism.logic.storage import INDEX_FILE, POLICIES, ImageStore  # noqa: E402
+
+
+def png_bytes():
+    return cv2.imencode(".png", np.full((8, 8, 3), 128, np.uint8))[1].tobytes()
+
+
+def check_recovery(root, failures):
+    today = datetime.now().strftime("%Y-%m-%d")
+    day = os.path.join(root, today)
+    os.makedirs(day)
+    good = png_bytes()
+    with open(os.path.join(day, INDEX_FILE), "w") as f:
+        json.dump({"synced": 3}, f)
+    files = {
+        "image_1.png": good,
+        "image_2.png": good,
+        "image_3.png": good,                 # written, index not yet updated
+        "image_4.png": good[:-20],           # renamed but data never hit the card
+        ".image_5.png.tmp": good,            # complete, rename interrupted
+        ".image_6.jpg.tmp": b"\xff\xd8\xff",  # interrupted mid-write
+        "image_8.png": good,                 # survived while image_7 did not
+    }
+    for name, data in files.items():
+        with open(os.path.join(day, name), "wb") as f:
+            f.write(data)
+
+    store = ImageStore(root, batch_size=4)
+    base = store.allocate()
+    expected = {
+        "next image": (os.path.basename(base), "image_9"),
+        "image_4 set aside": (os.path.exists(os.path.join(day, "image_4.png.partial")), True),
+        "image_5 renamed": (os.path.exists(os.path.join(day, "image_5.png")), True),
+        "temp files left": (sorted(n for n in os.listdir(day) if n.endswith(".tmp")), []),
+        "index": (json.load(open(os.path.join(day, INDEX_FILE)))["synced"], 9),
+    }
+    store.write(base + ".png", good)
+    store.commit()
+    store.flush()
+    expected["index after save"] = (json.load(open(os.path.join(day, INDEX_FILE)))["synced"], 10)
+    for label, (got, want) in expected.items():
+        ok = got == want
+        if not ok:
+            failures.append(label)
+        print(f"{label:<22} {got!s:<24} {'OK' if ok else f'FAIL (expected {want})'}")
+
+
+def check_numbering(root, count):
+    today = datetime.now().strftime("%Y-%m-%d")
+    day = os.path.join(root, today)
+    os.makedirs(day)
+    for i in range(1, count + 1):
+        open(os.path.join(day, f"image_{i}.png"), "w").close()
+
+    started = time.perf_counter()
+    file_index = 1
+    while os.path.exists(os.path.join(day, f"image_{file_index}.png")):
+        file_index += 1
+    probe_ms = (time.perf_counter() - started) * 1000
+
+    store = ImageStore(root)
+    started = time.perf_counter()
+    store.allocate()  # first use of the day: one scan of a folder without index
+    first_ms = (time.perf_counter() - started) * 1000
+    store.flush()
+    started = time.perf_counter()
+    store.allocate()
+    next_ms = (time.perf_counter() - started) * 1000
+    reopened = ImageStore(root)
+    started = time.perf_counter()
+    reopened.allocate()  # restart: index + a few stats
+    reopen_ms = (time.perf_counter() - started) * 1000
+    print(f"name for image {count + 1}: probe loop {probe_ms:.2f} ms, store first {first_ms:.2f} ms, "
+          f"then {next_ms:.3f} ms, after restart {reopen_ms:.2f} ms")
+
+
+def time_policies(directory, saves, kb):
+    data = os.urandom(kb * 1024)
+    for policy in POLICIES:
+        root = tempfile.mkdtemp(prefix=f"vpism-{policy}-", dir=directory)
+        try:
+            store = ImageStore(root, policy=policy)
+            times = []
+            for _ in range(saves):
+                started = time.perf_counter()
+                store.write(store.allocate() + ".png", data)
+                store.commit()
+                times.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            store.flush()
+            final_ms = (time.perf_counter() - started) * 1000
+            times.sort()
+            print(f"{policy:<7} per save p50 {times[len(times) // 2]:7.2f} ms  max {times[-1]:7.2f} ms  "
+                  f"final flush {final_ms:6.2f} ms")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--saves", type=int, default=20)
+    parser.add_argument("--kb", type=int, default=1500)
+    parser.add_argument("--dir", default=None, help="where to time the fsync policies")
+    args = parser.parse_args()
+
+    failures = []
+    workdir = tempfile.mkdtemp(prefix="vpism-storage-")
+    try:
+        check_recovery(os.path.join(workdir, "recovery"), failures)
+        check_numbering(os.path.join(workdir, "numbering"), args.files)
+        time_policies(args.dir or workdir, args.saves, args.kb)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
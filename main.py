@@ -1,17 +1,21 @@
 from vpism.gui.ui_scripts.load import Ui_MainWindow
 from PyQt5.QtWidgets import (
     QMainWindow, QApplication, QLabel, QPushButton, QDialog,
-    QVBoxLayout, QComboBox, QListWidget, QListWidgetItem
+    QVBoxLayout, QComboBox, QListWidget, QListWidgetItem, QShortcut
 )
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QPixmap, QIcon, QTransform
-import sys, os
+from PyQt5.QtCore import Qt, QSize, QEvent, QTimer
+from PyQt5.QtGui import QPixmap, QIcon, QKeySequence
+import sys, os, time
 from pathlib import Path
 import PyQt5
 from vpism.logic.video_thread import VideoThread
 from vpism.gui.brightness_dialog import BrightnessDialog
 from vpism.gui.show_files_dialog import ShowFilesDialog
+from vpism.gui.perf_hud import PerfHud
 from vpism.logic.buzzer_api import beep
+from vpism.logic.image_writer import SaveRequest, writer_from_env
+from vpism.logic import metrics, settings, tracing
+from vpism.logic.stall_watchdog import watchdog_from_env
 
 # Fix Qt plugin path (for PyQt5 on some platforms)
 os.environ["QT_QPA_PLATFORM_PLUGIN_PATH"] = os.fspath(
@@ -33,14 +37,50 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         super().__init__()
         self.setupUi(self)
         self.setFixedSize(800, 480)
-        self.rotation_angle = 0
-        # Camera wrapper thread
-        self.video_thread = VideoThread(source=0)
-        self.video_thread.frame_signal.connect(self.update_image)
+        # Span recording (VPISM_TRACE=1); dump with SIGUSR1 or Ctrl+Shift+T
+        tracing.configure_from_env()
+        tracing.install_signal_handler()
+        QShortcut(QKeySequence("Ctrl+Shift+T"), self, activated=tracing.dump)
+        # Prometheus metrics on localhost (VPISM_METRICS_PORT, 0 = off)
+        self.metrics_server = metrics.serve_from_env()
+        # Report event-loop stalls with the slot that caused them (VPISM_STALL_MS)
+        self.stall_watchdog = watchdog_from_env(self)
+        if self.stall_watchdog:
+            self.stall_watchdog.start()
+        # Orientation is remembered across restarts and applied by the camera
+        self.rotation_angle = settings.load_state().get("rotation", 0)
+        # VPISM_SAVE_RAW=1 also saves the unprocessed frame next to each capture
+        self.save_raw = settings.get_bool("VPISM_SAVE_RAW")
+        # Camera wrapper thread. Lay the window out first so the camera can be
+        # opened at the size of the label it is shown in
+        self.layout().setGeometry(self.rect())
+        self.centralWidget().layout().activate()
+        frame_size = self.image_frame.size()
+        self.video_thread = VideoThread(rotation=self.rotation_angle, keep_raw=self.save_raw,
+                                        workers=settings.workers(),
+                                        display_size=(frame_size.width(), frame_size.height()),
+                                        vein=settings.vein_options(),
+                                        blend_method=settings.blend_method())
+        self.video_thread.frame_ready.connect(self.pull_frame)
         self.video_thread.start()
+        # Saved frames are encoded and written on their own thread
+        self.image_writer = writer_from_env(self)
+        self.image_writer.saved.connect(self.on_image_saved)
+        self.image_writer.start()
         self.image_frame.setScaledContents(False)
-
-        # Store current frame + zoom factor
+        # Frames are scaled to the label size in the video thread
+        self.image_frame.installEventFilter(self)
+
+        # Performance HUD over the camera view: VPISM_HUD=1 or long-press to toggle
+        self.hud = PerfHud(self.video_thread, self.image_frame)
+        self.long_press_timer = QTimer(self)
+        self.long_press_timer.setSingleShot(True)
+        self.long_press_timer.setInterval(800)
+        self.long_press_timer.timeout.connect(self.hud.toggle)
+        if settings.get_bool("VPISM_HUD"):
+            self.hud.show()
+
+        # Still image picked from the files dialog (None while showing the camera) + zoom factor
         self.current_frame = None
         self.zoom_factor = 1.0
 
@@ -59,7 +99,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # Save/Show files button → open files dialog
         self.save_showfiles_button.clicked.connect(self.open_showfiles_dialog)
 
-        # Play/Pause button logic
+        # Play/Pause button logic. Icons are decoded once here: building a
+        # QIcon from the resource takes several ms, too slow for a tap
+        self.icons = {
+            name: QIcon(f":/imgs/icons/{name}.png") for name in ("play", "pause", "files", "save")
+        }
         self.play_pause_button.setProperty("paused", False)  # initial state
         self.save_showfiles_button.setProperty("showfiles", True)
         self.play_pause_button.clicked.connect(self.toggle_play_pause)
@@ -85,30 +129,60 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         paused = self.play_pause_button.property("paused")
         if paused:
             self.play_pause_button.setProperty("paused", False)
-            self.play_pause_button.setIcon(QIcon(":/imgs/icons/pause.png"))  # adjust to your resource path
-            self.save_showfiles_button.setIcon(QIcon(":/imgs/icons/files.png"))
+            self.play_pause_button.setIcon(self.icons["pause"])
+            self.save_showfiles_button.setIcon(self.icons["files"])
             self.save_showfiles_button.setProperty("showfiles", True)
+            self.current_frame = None
+            self.video_thread.set_paused(False)
         else:
-            self.play_pause_button.setIcon(QIcon(":/imgs/icons/play.png"))
+            self.play_pause_button.setIcon(self.icons["play"])
             self.play_pause_button.setProperty("paused", True)
-            self.save_showfiles_button.setIcon(QIcon(":/imgs/icons/save.png"))
+            self.save_showfiles_button.setIcon(self.icons["save"])
             self.save_showfiles_button.setProperty("showfiles", False)
+            self.video_thread.set_paused(True)
 
     # ----------------------------
     # Image update & zoom
     # ----------------------------
+    def pull_frame(self):
+        """Fetch the newest frame from the video thread's mailbox."""
+        frame = self.video_thread.take_frame()
+        if frame is not None:
+            # QPixmap.fromImage copies, so the pooled buffer can go back right after
+            started = time.perf_counter()
+            self.update_image(frame.image)
+            self.video_thread.timings.add("gui", time.perf_counter() - started)
+            self.video_thread.display_rate.tick()
+            metrics.FRAMES_DISPLAYED.inc()
+            if frame.captured_at is not None:
+                latency = time.monotonic() - frame.captured_at
+                self.video_thread.latency.add(latency)
+                metrics.LATENCY_SECONDS.observe(latency)
+            frame.release()
+
+    @tracing.traced("update_image", category="gui")
     def update_image(self, qt_img):
-        """Save latest frame and show with zoom applied."""
-        if self.play_pause_button.property("paused"):
-            return  # Do nothing if paused
-        
-        transform = QTransform().rotate(self.rotation_angle)
-        self.current_frame = QPixmap.fromImage(qt_img)
-        self.current_frame = self.current_frame.transformed(transform, Qt.SmoothTransformation)
-        self.apply_zoom()
-
+        """Show a frame that the video thread already rotated, zoomed and scaled."""
+        if self.current_frame is not None:
+            return  # A still image from the files dialog is shown
+
+        self.image_frame.setPixmap(QPixmap.fromImage(qt_img))
+
+    def eventFilter(self, obj, event):
+        if obj is self.image_frame:
+            if event.type() == QEvent.Resize:
+                size = event.size()
+                self.video_thread.set_display(size=(size.width(), size.height()))
+                self.hud.resize(size)
+            elif event.type() == QEvent.MouseButtonPress:
+                self.long_press_timer.start()
+            elif event.type() == QEvent.MouseButtonRelease:
+                self.long_press_timer.stop()
+        return super().eventFilter(obj, event)
+
+    @tracing.traced("apply_zoom", category="gui")
     def apply_zoom(self):
-        """Apply zoom (cropping) to current frame and display."""
+        """Apply zoom (cropping) to the still image from the files dialog and display."""
         if not self.current_frame:
             return
 
@@ -143,6 +217,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # Update button label
         self.scale_button.setText(f"{int(self.zoom_factor)}x")
 
+        self.video_thread.set_display(zoom=self.zoom_factor)
         self.apply_zoom()
 
     # ----------------------------
@@ -201,25 +276,22 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             dlg.move(x, y)
             dlg.exec_()
         else:
-            # Save pixmap to a file inside a folder named with today's date
-            pixmap = self.image_frame.pixmap()
-            if pixmap:
-                from datetime import datetime
-                import os
-
-                date_str = datetime.now().strftime("%Y-%m-%d")
-                dir_path = os.path.join("saved_images", date_str)
-                os.makedirs(dir_path, exist_ok=True)
-
-                file_index = 1
-                while True:
-                    file_path = os.path.join(dir_path, f"image_{file_index}.png")
-                    if not os.path.exists(file_path):
-                        break
-                    file_index += 1
-
-                pixmap.save(file_path)
-                print(f"Saved image to: {file_path}")
+            # Save the processed camera frame at full resolution into a
+            # folder named with today's date; only the copy happens here
+            snapshot = self.video_thread.snapshot(raw=self.save_raw)
+            if snapshot is None:
+                print("No frame to save yet")
+                return
+            frame, raw, rotation, zoom = snapshot
+            self.image_writer.submit(SaveRequest(frame, raw, rotation, zoom))
+
+    def on_image_saved(self, request):
+        """Completion of a save from the image writer (GUI thread)."""
+        if request.outcome == "saved":
+            print(f"Saved image to: {', '.join(request.paths)}")
+            beep(1600, 0.05)
+        else:
+            beep(200, 0.3)
 
     def set_image_from_dialog(self, pixmap: QPixmap):
         """Set the QLabel to show the selected image and update pause button icon."""
@@ -227,26 +299,34 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             return
 
         self.current_frame = pixmap
+        self.video_thread.set_paused(True)
         self.apply_zoom()
         # Set pause icon
-        pause_icon = QIcon(":/imgs/icons/play.png")  # adjust to your resource path
-        self.play_pause_button.setIcon(pause_icon)
+        self.play_pause_button.setIcon(self.icons["play"])
         self.play_pause_button.setProperty("paused", True)
 
     # ----------------------------
     # Rotate image
     # ----------------------------
     def rotate_image(self):
-        """Rotate the current frame upside down (180°)."""
-        if not self.current_frame:
-            return
+        """Rotate the camera view upside down (180°)."""
         self.rotation_angle = (self.rotation_angle + 180) % 360
+        self.video_thread.set_display(rotation=self.rotation_angle)
+        settings.save_state(rotation=self.rotation_angle)
     # ----------------------------
     # Cleanup
     # ----------------------------
     def closeEvent(self, event):
         if self.video_thread:
             self.video_thread.stop()
+            print(f"Capture-to-display latency: {self.video_thread.latency.summary()}")
+        # Queued saves are written before exiting
+        self.image_writer.stop()
+        if self.stall_watchdog:
+            self.stall_watchdog.stop()
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
         event.accept()
 
 
@@ -1,5 +1,5 @@
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QSlider, QPushButton
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt
 from vpism.logic.led_api import set_brightness
 from vpism.logic.buzzer_api import beep, buzzer_cleanup
 
@@ -114,8 +114,9 @@ class BrightnessDialog(QDialog):
         """Update display and send brightness."""
         self.value_label.setText(str(value))
         BrightnessDialog.value = value
-        # Debounced hardware call
-        QTimer.singleShot(50, lambda: set_brightness(value))
+        # Returns at once; the LED controller coalesces a drag into at
+        # most one PWM write per display frame
+        set_brightness(value)
 
     def adjust_value(self, delta):
         """Increase or decrease brightness by delta."""
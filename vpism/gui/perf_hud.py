@@ -0,0 +1,77 @@
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QTimer, QRect
+from PyQt5.QtGui import QPainter, QColor, QFont
+from vpism.logic.metrics import cpu_temperature
+
+
+# -----------------------------
+# Performance HUD
+# -----------------------------
+class PerfHud(QWidget):
+    """
+    Transparent overlay on top of the camera label showing frame rates,
+    per-stage times, dropped frames, CPU temperature and the mode.
+    Painted with QPainter over the already scaled pixmap, so the frames
+    themselves are untouched; the stats are sampled twice a second and
+    only while the HUD is visible.
+    """
+
+    STAGES = ("capture", "process", "convert", "gui")
+
+    def __init__(self, video_thread, parent):
+        super().__init__(parent)
+        self.video_thread = video_thread
+        self.lines = []
+        self.setAttribute(Qt.WA_TransparentForMouseEvents, True)
+        self.setAttribute(Qt.WA_NoSystemBackground, True)
+        self.setFont(QFont("monospace", 9))
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+
+    def showEvent(self, event):
+        self.resize(self.parentWidget().size())
+        self.raise_()
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        thread = self.video_thread
+        timings = thread.timings.snapshot()
+        stages = "  ".join(f"{s} {timings[s]:.1f}" for s in self.STAGES if s in timings)
+        p95, = thread.latency.percentiles(95)
+        temperature = cpu_temperature()
+        self.lines = [
+            f"mode {thread.camera.current_mode}",
+            f"fps capture {thread.pipeline.capture_rate.rate():.1f}"
+            f"  display {thread.display_rate.rate():.1f}",
+            f"ms {stages}" if stages else "ms -",
+            f"dropped {thread.dropped_frames}"
+            + (f"  latency p95 {p95:.0f} ms" if p95 is not None else ""),
+            f"cpu {temperature:.1f} °C" if temperature is not None else "cpu -",
+        ]
+        self.update()
+
+    def paintEvent(self, event):
+        if not self.lines:
+            return
+        painter = QPainter(self)
+        metrics = painter.fontMetrics()
+        line_height = metrics.height()
+        width = max(metrics.horizontalAdvance(line) for line in self.lines) + 12
+        box = QRect(6, 6, width, line_height * len(self.lines) + 8)
+        painter.fillRect(box, QColor(0, 0, 0, 150))
+        painter.setPen(QColor("#e0e0e0"))
+        for i, line in enumerate(self.lines):
+            painter.drawText(box.x() + 6, box.y() + 4 + metrics.ascent() + i * line_height, line)
+        painter.end()
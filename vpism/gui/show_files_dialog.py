@@ -3,10 +3,118 @@ from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QComboBox,
     QListWidget, QListWidgetItem
 )
-from PyQt5.QtCore import Qt, QSize, pyqtSignal, QPoint
-from PyQt5.QtGui import QPixmap, QIcon
+from PyQt5.QtCore import Qt, QSize, pyqtSignal, QPoint, QObject, QRunnable, QThreadPool
+from PyQt5.QtGui import QPixmap, QIcon, QImage, QImageReader, QColor
 from pathlib import Path
 import sys
+import threading
+import time
+from vpism.logic import metrics, settings, tracing
+
+THUMB_SIZE = QSize(100, 100)
+IMAGE_EXTS = [".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif"]
+
+
+def read_thumbnail(path, size=THUMB_SIZE):
+    """
+    Decode an image straight to thumbnail size (safe off the GUI thread).
+    QImageReader scales while decoding, which for JPEG skips most of the
+    work. Returns a null QImage if the file can't be read.
+    """
+    reader = QImageReader(str(path))
+    reader.setAutoTransform(True)
+    full = reader.size()
+    if full.isValid():
+        reader.setScaledSize(full.scaled(size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if not image.isNull() and (image.width() > size.width() or image.height() > size.height()):
+        # Formats that ignore setScaledSize
+        image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+# -----------------------------
+# Background thumbnail loading
+# -----------------------------
+class ThumbnailLoader(QObject):
+    """
+    Decodes thumbnails on a QThreadPool and emits them as they finish.
+
+    load() replaces the job list and starts a new generation; results of
+    older generations are never emitted, so switching folders cancels
+    everything still in flight. prioritize() moves jobs (e.g. the visible
+    items) to the front of the queue.
+    """
+    loaded = pyqtSignal(int, int, QImage)  # generation, key, image (null on failure)
+    finished = pyqtSignal(int)             # generation
+
+    def __init__(self, threads=2):
+        super().__init__()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(threads)
+        self.generation = 0
+        self._jobs = {}         # key -> path, in queue order
+        self._remaining = 0
+        self._lock = threading.Lock()
+
+    def load(self, jobs):
+        """jobs: (key, path) pairs."""
+        with self._lock:
+            self.generation += 1
+            self._jobs = dict(jobs)
+            self._remaining = len(self._jobs)
+            generation = self.generation
+            workers = min(self.pool.maxThreadCount(), len(self._jobs))
+        for _ in range(workers):
+            self.pool.start(_ThumbnailWorker(self, generation))
+        return generation
+
+    def prioritize(self, keys):
+        with self._lock:
+            front = {key: self._jobs.pop(key) for key in keys if key in self._jobs}
+            front.update(self._jobs)
+            self._jobs = front
+
+    def cancel(self):
+        with self._lock:
+            self.generation += 1
+            self._jobs = {}
+
+    def _next(self, generation):
+        with self._lock:
+            if generation != self.generation or not self._jobs:
+                return None
+            key = next(iter(self._jobs))
+            return key, self._jobs.pop(key)
+
+    def _done(self, generation, key, image):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._remaining -= 1
+            last = self._remaining == 0
+        self.loaded.emit(generation, key, image)
+        if last:
+            self.finished.emit(generation)
+
+
+class _ThumbnailWorker(QRunnable):
+    """Takes jobs of one generation until there are none left."""
+
+    def __init__(self, loader, generation):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+
+    def run(self):
+        while True:
+            job = self.loader._next(self.generation)
+            if job is None:
+                return
+            key, path = job
+            with tracing.span("thumbnail", category="io"):
+                image = read_thumbnail(path)
+            self.loader._done(self.generation, key, image)
 
 # -----------------------------
 # Frameless confirmation dialog
@@ -69,7 +177,7 @@ class ShowFilesDialog(QDialog):
         super().__init__(parent)
         self.setFixedSize(500, 400)
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.Popup | Qt.WindowStaysOnTopHint)
-        self.base_dir = Path("saved_images")
+        self.base_dir = Path(settings.get_str("VPISM_SAVE_DIR", "saved_images"))
 
         self.setStyleSheet("""
             QDialog { background-color: #2b2b2b; color: #e0e0e0; font-family: 'Segoe UI'; font-size: 13px; }
@@ -103,6 +211,17 @@ class ShowFilesDialog(QDialog):
         self.list_widget.setSpacing(10)
         layout.addWidget(self.list_widget)
 
+        # Thumbnails decode on worker threads; items show a placeholder until then
+        placeholder = QPixmap(THUMB_SIZE)
+        placeholder.fill(QColor("#44475a"))
+        self.placeholder = QIcon(placeholder)
+        self.items = {}  # job key -> QListWidgetItem of the current date
+        self.load_started = None
+        self.loader = ThumbnailLoader(threads=settings.get_int("VPISM_THUMB_THREADS", 2))
+        self.loader.loaded.connect(self.on_thumbnail_loaded)
+        self.loader.finished.connect(self.on_thumbnails_finished)
+        self.list_widget.verticalScrollBar().valueChanged.connect(self.prioritize_visible)
+
         self.date_box.currentTextChanged.connect(self.load_images)
         self.list_widget.itemDoubleClicked.connect(self.on_item_double_clicked)
         self.load_dates()
@@ -119,31 +238,69 @@ class ShowFilesDialog(QDialog):
         if dates:
             self.load_images(dates[0])
 
+    @tracing.traced("load_images", category="gui")
     def load_images(self, date_str):
+        """List the day's images at once; thumbnails follow in the background."""
+        self.loader.cancel()  # drop what is still loading for the previous date
         self.list_widget.clear()
+        self.items = {}
+        self.load_started = None
         date_dir = self.base_dir / date_str
         if not date_dir.exists(): return
-        for file in sorted(date_dir.iterdir()):
-            if file.suffix.lower() in [".png", ".jpg", ".jpeg", ".bmp", ".gif"]:
-                pixmap = QPixmap(str(file))
-                if not pixmap.isNull():
-                    item = QListWidgetItem(file.stem)
-                    item.setIcon(QIcon(pixmap.scaled(100, 100, Qt.KeepAspectRatio, Qt.SmoothTransformation)))
-                    self.list_widget.addItem(item)
+        self.load_started = time.perf_counter()
+        jobs = {}
+        for key, file in enumerate(sorted(date_dir.iterdir())):
+            if file.suffix.lower() in IMAGE_EXTS:
+                item = QListWidgetItem(self.placeholder, file.stem)
+                item.setData(Qt.UserRole, str(file))
+                self.list_widget.addItem(item)
+                self.items[key] = item
+                jobs[key] = file
+        if not jobs:
+            # Nothing to decode, so the loader would never report finished
+            self.on_thumbnails_finished(self.loader.generation)
+            return
+        # Visible items first
+        self.list_widget.doItemsLayout()
+        order = self.visible_keys()
+        visible = set(order)
+        order += [key for key in jobs if key not in visible]
+        self.loader.load((key, jobs[key]) for key in order)
+
+    def visible_keys(self):
+        viewport = self.list_widget.viewport().rect()
+        return [key for key, item in self.items.items()
+                if self.list_widget.visualItemRect(item).intersects(viewport)]
+
+    def prioritize_visible(self):
+        self.loader.prioritize(self.visible_keys())
+
+    def on_thumbnail_loaded(self, generation, key, image):
+        item = self.items.get(key)
+        if generation != self.loader.generation or item is None:
+            return
+        if image.isNull():
+            # Not a readable image: leave it out, as before
+            self.list_widget.takeItem(self.list_widget.row(item))
+            del self.items[key]
+        else:
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+
+    def on_thumbnails_finished(self, generation):
+        if generation == self.loader.generation and self.load_started is not None:
+            metrics.GALLERY_LOAD_SECONDS.observe(time.perf_counter() - self.load_started)
+            self.load_started = None
+
+    def closeEvent(self, event):
+        self.loader.cancel()
+        super().closeEvent(event)
 
     # -----------------------------
     # Double-click → emit image
     # -----------------------------
     def on_item_double_clicked(self, item: QListWidgetItem):
-        date_str = self.date_box.currentText()
-        supported_exts = [".png", ".jpg", ".jpeg", ".bmp", ".gif"]
-        file_path = None
-        for ext in supported_exts:
-            path = self.base_dir / date_str / (item.text() + ext)
-            if path.exists():
-                file_path = path
-                break
-        if file_path:
+        file_path = Path(item.data(Qt.UserRole))
+        if file_path.exists():
             pixmap = QPixmap(str(file_path))
             if not pixmap.isNull():
                 self.image_selected.emit(pixmap)
@@ -157,17 +314,11 @@ class ShowFilesDialog(QDialog):
         selected_items = self.list_widget.selectedItems()
         if not selected_items: return
         item = selected_items[0]
-        file_name = item.text()
-        date_str = self.date_box.currentText()
-        supported_exts = [".png", ".jpg", ".jpeg", ".bmp", ".gif"]
-        file_path = None
-        for ext in supported_exts:
-            path = self.base_dir / date_str / (file_name + ext)
-            if path.exists():
-                file_path = path
-                break
-        if not file_path: return
+        file_path = Path(item.data(Qt.UserRole))
+        if not file_path.exists(): return
         confirm_dialog = ConfirmDialog(f"Do you really want to delete '{file_path.name}'?", self)
         if confirm_dialog.exec() == QDialog.Accepted:
             file_path.unlink()
-            self.load_images(date_str)
+            # Only this item goes; the other thumbnails stay as they are
+            self.list_widget.takeItem(self.list_widget.row(item))
+            self.items = {key: other for key, other in self.items.items() if other is not item}
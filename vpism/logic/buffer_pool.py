@@ -0,0 +1,77 @@
+import threading
+
+import numpy as np
+
+
+# =========================
+# Buffer Pool
+# =========================
+class BufferPool:
+    """
+    Reusable C-contiguous uint8 frame buffers, keyed by shape.
+
+    acquire() hands out a free buffer (allocating only when none of that
+    shape is free) and release() returns it. reserve() preallocates the
+    worst case for a shape up front, so the pipeline stops allocating as
+    soon as a shape is first seen. `allocated` shows how many buffers were
+    ever created, `outstanding` how many are currently handed out.
+    """
+
+    def __init__(self, dtype=np.uint8):
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        self._free = {}
+        self._counts = {}
+        self.allocated = 0
+        self.outstanding = 0
+
+    def acquire(self, shape):
+        shape = tuple(shape)
+        with self._lock:
+            free = self._free.get(shape)
+            self.outstanding += 1
+            if free:
+                return free.pop()
+            self.allocated += 1
+            self._counts[shape] = self._counts.get(shape, 0) + 1
+        return np.empty(shape, dtype=self.dtype)
+
+    def release(self, buffer):
+        with self._lock:
+            self.outstanding -= 1
+            self._free.setdefault(buffer.shape, []).append(buffer)
+
+    def reserve(self, shape, count):
+        """Make sure at least `count` buffers of this shape exist."""
+        shape = tuple(shape)
+        with self._lock:
+            missing = count - self._counts.get(shape, 0)
+            if missing <= 0:
+                return
+            free = self._free.setdefault(shape, [])
+            for _ in range(missing):
+                free.append(np.empty(shape, dtype=self.dtype))
+            self._counts[shape] = count
+            self.allocated += missing
+
+
+class PooledImage:
+    """
+    A QImage that points into a pooled buffer. The buffer stays reserved
+    until release() is called, after which the QImage must not be used.
+    captured_at: time.monotonic() of the camera frame it was made from.
+    """
+
+    __slots__ = ("image", "buffer", "captured_at", "_pool")
+
+    def __init__(self, image, buffer, pool, captured_at=None):
+        self.image = image
+        self.buffer = buffer
+        self.captured_at = captured_at
+        self._pool = pool
+
+    def release(self):
+        if self._pool is not None:
+            self._pool.release(self.buffer)
+            self._pool = None
+            self.image = None
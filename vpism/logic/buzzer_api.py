@@ -1,49 +1,185 @@
-try:
-    import RPi.GPIO as GPIO
-    _rpi = True
-except ImportError:
-    print("⚠️ RPi.GPIO not found — running in simulation mode.")
-    _rpi = False
-
-if _rpi:
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(23, GPIO.OUT)
-    buzzer = GPIO.PWM(23, 1000)  # default frequency = 1000 Hz
-    buzzer_started = False
-else:
-    buzzer = None
-    buzzer_started = False
+import collections
+import threading
+import time
+
+from vpism.logic.pwm import SimulatedPwm, open_pwm
+
+# Buzzer on BCM 23, which has no hardware PWM: RPi.GPIO unless rewired to
+# a PWM pin and VPISM_BUZZER_PWM is set (see pwm.open_pwm)
+buzzer = open_pwm("buzzer", pin=23, frequency=1000)  # default frequency = 1000 Hz
+
+
+class ToneRequest:
+    """
+    One beep or tone pattern and what became of it (all times
+    time.monotonic()). outcome: "queued", "played", "merged", "dropped" or
+    "failed" (the buzzer raised; error holds the message).
+    """
+
+    __slots__ = ("pattern", "requested_at", "returned_at", "started_at", "finished_at",
+                 "outcome", "error")
+
+    def __init__(self, pattern, requested_at):
+        self.pattern = pattern
+        self.requested_at = requested_at
+        self.returned_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.outcome = "queued"
+        self.error = None
+
+
+# =========================
+# Buzzer Service
+# =========================
+class BuzzerService:
+    """
+    Plays tones on a background thread so callers (button slots) never
+    wait for the buzzer.
+
+    Requests go into a bounded queue of `max_pending`. During rapid tapping
+    a request equal to the last queued one, or to the one that started
+    playing less than `merge_window` seconds ago, is merged into it. When
+    the queue is full the oldest waiting request is dropped. Every request
+    is kept in `history` with its timings, in simulation mode too.
+    """
+
+    def __init__(self, max_pending=2, merge_window=0.15, history=200):
+        self.max_pending = max_pending
+        self.merge_window = merge_window
+        self.history = collections.deque(maxlen=history)
+        self.merged = 0
+        self.dropped = 0
+        self._pending = collections.deque()
+        self._playing = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = True
+
+    def play(self, pattern):
+        """
+        Queue a pattern of (frequency Hz, duration s) tones; frequency 0 is
+        a rest. Returns the ToneRequest without waiting.
+        """
+        request = ToneRequest(tuple(pattern), time.monotonic())
+        with self._cond:
+            self.history.append(request)
+            playing = self._playing
+            if self._pending and self._pending[-1].pattern == request.pattern:
+                request.outcome = "merged"
+                self.merged += 1
+            elif (playing is not None and playing.pattern == request.pattern
+                  and request.requested_at - playing.started_at < self.merge_window):
+                request.outcome = "merged"
+                self.merged += 1
+            else:
+                if len(self._pending) >= self.max_pending:
+                    self._pending.popleft().outcome = "dropped"
+                    self.dropped += 1
+                self._pending.append(request)
+                self._cond.notify_all()
+            if self._thread is None and self._running:
+                self._thread = threading.Thread(target=self._run, name="buzzer", daemon=True)
+                self._thread.start()
+        request.returned_at = time.monotonic()
+        return request
+
+    def beep(self, frequency=1000, duration=0.2):
+        return self.play([(frequency, duration)])
+
+    def wait_idle(self, timeout=None):
+        """Block until every queued tone has played (for scripts and tests)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._playing is not None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            for request in self._pending:
+                request.outcome = "dropped"
+            self._pending.clear()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                request = self._playing = self._pending.popleft()
+                request.started_at = time.monotonic()
+            outcome = "played"
+            try:
+                for frequency, duration in request.pattern:
+                    _tone(frequency, duration)
+            except Exception as e:
+                # Keep the service alive; the next request tries again
+                print(f"Error playing tone: {e}")
+                request.error = str(e)
+                outcome = "failed"
+                _silence()
+            with self._cond:
+                request.finished_at = time.monotonic()
+                request.outcome = outcome
+                self._playing = None
+                self._cond.notify_all()
+
+
+def _tone(frequency, duration):
+    if not frequency:
+        time.sleep(duration)  # rest
+        return
+    if isinstance(buzzer, SimulatedPwm):
+        print(f"[Simulated] Beep at {frequency} Hz for {duration} sec")
+    buzzer.set_frequency(frequency)
+    buzzer.start(50)  # 50% duty cycle (on)
+    time.sleep(duration)
+    buzzer.stop()
+
+
+def _silence():
+    """Best effort: don't leave the buzzer on after a failed tone."""
+    try:
+        buzzer.stop()
+    except Exception as e:
+        print(f"Error stopping buzzer: {e}")
+
+
+service = BuzzerService()
 
 
 def beep(frequency: int = 1000, duration: float = 0.2):
     """
-    Make the buzzer beep at a given frequency and duration.
+    Make the buzzer beep at a given frequency and duration, without
+    waiting for it (the tone plays on the buzzer thread).
     frequency: in Hz (e.g. 440 = A note, 1000 = typical beep)
     duration: in seconds (float)
     """
-    import time
+    return service.beep(frequency, duration)
 
-    if _rpi:
-        global buzzer_started
-        if not buzzer_started:
-            buzzer.start(50)  # 50% duty cycle (on)
-            buzzer_started = True
-        buzzer.ChangeFrequency(frequency)
-        time.sleep(duration)
-        buzzer.stop()
-        buzzer_started = False
-    else:
-        print(f"[Simulated] Beep at {frequency} Hz for {duration} sec")
+
+def play(pattern):
+    """Queue a tone pattern, e.g. [(1200, 0.08), (0, 0.05), (1600, 0.08)]."""
+    return service.play(pattern)
 
 
 def buzzer_cleanup():
     """
-    Clean up GPIO after use.
+    Stop the buzzer thread and release the PWM output.
     """
-    if _rpi:
-        buzzer.stop()
-        GPIO.cleanup()
-    else:
+    service.stop()
+    buzzer.close()
+    if isinstance(buzzer, SimulatedPwm):
         print("[Simulated] Cleanup complete")
 
 
@@ -51,4 +187,5 @@ def buzzer_cleanup():
 if __name__ == "__main__":
     beep(1000, 0.2)  # short beep
     beep(1500, 0.3)  # higher beep
-    cleanup()
+    service.wait_idle()
+    buzzer_cleanup()
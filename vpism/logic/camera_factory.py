@@ -0,0 +1,67 @@
+from vpism.logic import fake_picamera2, settings
+from vpism.logic.camera_wrapper import CameraWrapper, ImageWrapper, Picamera2Wrapper
+from vpism.logic.replay_sources import ImageFolderSource, RawRecordingSource, VideoFileSource
+
+
+def open_camera(spec=None, rotation=0, size=None):
+    """
+    Create the CameraInterface named by spec (default: VPISM_SOURCE, else
+    "picamera2"):
+
+        picamera2             Raspberry Pi camera (options: VPISM_CAMERA_*)
+        picamera2:fake        the same wrapper on a simulated camera
+                              (options: VPISM_CAMERA_*, VPISM_FAKE_*)
+        opencv:<index|url>    cv2.VideoCapture device (options: VPISM_CV_*)
+        image:<file>          one still image, looped
+        video:<file>          a video file
+        folder:<dir>          every image in a directory
+        raw:<file>            a .npy or raw uint8 recording
+
+    Replays (video/folder/raw) are paced by VPISM_REPLAY_FPS (default 30,
+    0 = as fast as possible), loop unless VPISM_REPLAY_LOOP=0 and prefetch
+    VPISM_REPLAY_PREFETCH frames (default 4). Raw files without a .npy
+    header need VPISM_RAW_SIZE=WxH and optionally VPISM_RAW_CHANNELS.
+
+    size: (width, height) of the display area. Unless VPISM_CAMERA_SIZE is
+    set, the Pi camera delivers frames at that size (rounded down to even
+    numbers for the YUV420 stream) so they need no software rescale.
+    """
+    if spec is None:
+        spec = settings.get_str("VPISM_SOURCE", "picamera2")
+    kind, _, target = str(spec).partition(":")
+
+    if kind == "picamera2":
+        backend = None
+        if target == "fake":
+            backend = fake_picamera2.backend(**settings.fake_picamera2_options())
+        options = {}
+        if size is not None:
+            options["size"] = (size[0] - size[0] % 2, size[1] - size[1] % 2)
+        return Picamera2Wrapper(rotation=rotation, backend=backend,
+                                **settings.picamera2_options(**options))
+    if kind == "opencv":
+        device = int(target) if target.isdigit() else (target or 0)
+        return CameraWrapper(device, rotation=rotation, **settings.opencv_options())
+
+    fps = settings.get_float("VPISM_REPLAY_FPS", 30.0)
+    if kind == "image":
+        return ImageWrapper(target, rotation=rotation, fps=fps)
+
+    replay = {
+        "rotation": rotation,
+        "fps": fps,
+        "loop": settings.get_bool("VPISM_REPLAY_LOOP", True),
+        "prefetch": settings.get_int("VPISM_REPLAY_PREFETCH", 4),
+    }
+    if kind == "video":
+        return VideoFileSource(target, **replay)
+    if kind == "folder":
+        return ImageFolderSource(target, **replay)
+    if kind == "raw":
+        return RawRecordingSource(
+            target,
+            size=settings.get_size("VPISM_RAW_SIZE"),
+            channels=settings.get_int("VPISM_RAW_CHANNELS", 3),
+            **replay,
+        )
+    raise ValueError(f"Unknown camera source: {spec}")
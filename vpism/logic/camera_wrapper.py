@@ -1,26 +1,56 @@
 import sys
 import cv2
 import time
+import threading
 import numpy as np
 from abc import ABC, abstractmethod
 from PyQt5.QtWidgets import QApplication, QLabel, QPushButton, QVBoxLayout, QWidget
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import QTimer
+from vpism.logic.vein_enhancer import VeinEnhancer
+from vpism.logic import tracing
 
 try:
-    from picamera2 import Picamera2
+    from picamera2 import Picamera2, MappedArray
 except ImportError:
     Picamera2 = None
+    MappedArray = None
     print("Picamera2 library not found. Picamera2Wrapper will not work.")
 
+try:
+    from libcamera import Transform
+except ImportError:
+    Transform = None
+
 
 # =========================
 # Abstract Camera Interface
 # =========================
 class CameraInterface(ABC):
-    @abstractmethod
     def read(self):
         """Return (ret, frame) just like cv2.VideoCapture.read()"""
+        ret, frame = self.capture()
+        if not ret:
+            return False, None
+        return True, self.process(frame)
+
+    @abstractmethod
+    def capture(self, out=None):
+        """
+        Return (ret, frame) without mode processing applied.
+        out: optional buffer to capture into; implementations may ignore it
+        (e.g. on a shape mismatch) and return a different array.
+        """
+        pass
+
+    @abstractmethod
+    def process(self, frame, out=None, rotation=None):
+        """
+        Apply the current mode to a captured frame.
+        rotation: the orientation frame_view() stamped on this frame at
+        capture (default: the current one); sources that rotate in
+        software flip by it.
+        """
         pass
 
     @abstractmethod
@@ -36,88 +66,319 @@ class CameraInterface(ABC):
     def current_mode(self):
         pass
 
+    # Zoom factor currently applied by the camera itself (1.0 = none)
+    hardware_zoom = 1.0
+    # Orientation of the frames the source currently delivers (0 or 180)
+    rotation = 0
+    # time.monotonic() at which the last captured frame was taken, if the
+    # source knows better than "when capture() returned"
+    last_capture_time = None
+
+    @abstractmethod
+    def set_rotation(self, rotation):
+        """Deliver frames upside down (180) or not (0) from now on."""
+        pass
+
+    def set_zoom(self, factor):
+        """
+        Zoom on the camera side if the source supports it. Returns False
+        when the caller has to crop in software instead.
+        """
+        return False
+
+    def frame_view(self):
+        """
+        (rotation, zoom) of the frame the last capture() returned. Called on
+        the capture thread right after capture(), so frames still in flight
+        keep the view they were captured with.
+        """
+        return self.rotation, self.hardware_zoom
+
 
 # =========================
 # Mode Mixin
 # =========================
 class ModeMixin:
     modes = ["normal", "inverted", "vein"]
+    blend_method = "weighted"  # see VignetteCompositor
+    # Orientation is a flip in process() rather than done by the source
+    software_rotation = True
 
-    def __init__(self, mode="normal"):
+    def __init__(self, mode="normal", rotation=0):
         self.mode_index = self.modes.index(mode)
-        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        ModeMixin.set_rotation(self, rotation)
+        self.vein_enhancer = VeinEnhancer()
+        self._compositor = None
+        self._local = threading.local()
 
     def switch_mode(self):
         self.mode_index = (self.mode_index + 1) % len(self.modes)
 
+    def set_rotation(self, rotation):
+        """
+        Software orientation: one in-place cv2.flip of the output buffer,
+        decided per frame from the rotation stamped at capture.
+        """
+        if rotation not in (0, 180):
+            raise ValueError(f"Unsupported rotation: {rotation}")
+        self.rotation = rotation
+
     @property
     def current_mode(self):
         return self.modes[self.mode_index]
 
-    def _apply_vein_detection(self, frame, clahe_iterations=5):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        enhanced = gray.copy()
-        for _ in range(clahe_iterations):
-            enhanced = self.clahe.apply(enhanced)
-        return cv2.cvtColor(enhanced, cv2.COLOR_GRAY2BGR)
+    def _apply_vein_detection(self, frame, clahe_iterations=None, out=None):
+        """
+        Single-channel (luma) frames stay single-channel.
+        clahe_iterations: override the enhancer's configured pass count.
+        out: destination shaped like frame (may be a view); when given, the
+        gray intermediates live in per-thread scratch buffers.
+        """
+        if out is None:
+            if frame.ndim == 2:
+                return self.vein_enhancer.apply(frame, clahe_iterations)
+            to_gray, from_gray = self._gray_codes(frame)
+            enhanced = self.vein_enhancer.apply(cv2.cvtColor(frame, to_gray), clahe_iterations)
+            return cv2.cvtColor(enhanced, from_gray)
+
+        if frame.ndim == 2:
+            return self.vein_enhancer.apply(frame, clahe_iterations, out=out)
+        to_gray, from_gray = self._gray_codes(frame)
+        gray, enhanced = self._gray_scratch(frame.shape[:2])
+        cv2.cvtColor(frame, to_gray, dst=gray)
+        self.vein_enhancer.apply(gray, clahe_iterations, out=enhanced)
+        return cv2.cvtColor(enhanced, from_gray, dst=out)
+
+    @staticmethod
+    def _gray_codes(frame):
+        """cvtColor codes to and from gray for BGR or BGRX frames."""
+        if frame.shape[2] == 4:
+            return cv2.COLOR_BGRA2GRAY, cv2.COLOR_GRAY2BGRA
+        return cv2.COLOR_BGR2GRAY, cv2.COLOR_GRAY2BGR
+
+    def _gray_scratch(self, shape):
+        """Two per-thread single-channel buffers for the vein ROI."""
+        local = self._local
+        scratch = getattr(local, "gray", None)
+        if scratch is None or scratch[0].shape != shape:
+            scratch = local.gray = (np.empty(shape, np.uint8), np.empty(shape, np.uint8))
+        return scratch
 
-    def _apply_mode(self, frame, roi_ratio=0.8, alpha=0.7):
+    def process(self, frame, out=None, rotation=None):
+        return self._apply_mode(frame, out=out, rotation=rotation)
+
+    @tracing.traced("apply_mode")
+    def _apply_mode(self, frame, roi_ratio=0.8, alpha=0.7, out=None, rotation=None):
         """
         roi_ratio: how big the ROI is compared to the frame (0.5 = half)
         alpha: transparency of background (1 = solid white, 0 = fully original)
+        out: destination array shaped like frame. When omitted the result is
+        a buffer owned by the mixin that is overwritten by the next call, so
+        concurrent callers must pass their own.
+        rotation: orientation of this frame (default: the current one)
         """
-        h, w = frame.shape[:2]
+        if rotation is None:
+            rotation = self.rotation
+        key = (frame.shape, roi_ratio, alpha, self.blend_method)
+        if self._compositor is None or self._compositor.key != key:
+            self._compositor = VignetteCompositor(
+                frame.shape, roi_ratio, alpha, self.blend_method
+            )
+        compositor = self._compositor
+
+        # Blend whole frame with white, then process the ROI straight into
+        # its slot of the output buffer
+        output = compositor.blend(frame, out)
+        roi = compositor.roi(frame)
+        out_roi = compositor.roi(output)
+
+        # Apply current mode only to ROI
+        mode = self.current_mode
+        if mode == "inverted":
+            cv2.bitwise_not(roi, dst=out_roi)
+        elif mode == "vein":
+            self._apply_vein_detection(roi, out=out_roi)
+        else:
+            out_roi[...] = roi
+
+        if output.ndim == 3 and output.shape[2] == 4:
+            # BGRX is shown as Format_RGB32, which needs X = 0xFF; the blend
+            # and bitwise_not change it
+            output[..., 3] = 255
+
+        if self.software_rotation and rotation == 180:
+            cv2.flip(output, -1, dst=output)
+        return output
+
+
+# =========================
+# Vignette Compositor
+# =========================
+class VignetteCompositor:
+    """
+    Precomputed white-blend + centered ROI layout for one frame shape.
+
+    method="weighted" (default) blends with cv2.addWeighted against a
+    cached white plane into a reused buffer.
+
+    method="lut" bakes the blend ``frame * (1 - alpha) + 255 * alpha``,
+    which only depends on the input pixel value, into a 256-entry table
+    built with cv2.addWeighted itself and applies it with cv2.LUT. Both
+    are bit-exact with the per-frame version; which one is faster depends
+    on the CPU (see benchmarks/bench_apply_mode.py and
+    VPISM_BLEND_METHOD).
+    """
+
+    methods = ("lut", "weighted")
+
+    def __init__(self, shape, roi_ratio=0.8, alpha=0.7, method="weighted"):
+        if method not in self.methods:
+            raise ValueError(f"Unknown blend method: {method}")
+        self.key = (shape, roi_ratio, alpha, method)
+        self.method = method
+        self.alpha = alpha
+        h, w = shape[:2]
 
         # ROI square based on ratio
         roi_size = int(min(h, w) * roi_ratio)
         x1 = (w - roi_size) // 2
         y1 = (h - roi_size) // 2
-        x2 = x1 + roi_size
-        y2 = y1 + roi_size
+        self.roi_slice = (slice(y1, y1 + roi_size), slice(x1, x1 + roi_size))
 
-        # Make white overlay
-        white_bg = np.ones_like(frame, dtype=np.uint8) * 255
-
-        # Blend frame with white to get semi-transparent effect
-        output = cv2.addWeighted(frame, 1 - alpha, white_bg, alpha, 0)
-
-        # Extract ROI from original
-        roi = frame[y1:y2, x1:x2]
+        if method == "lut":
+            ramp = np.arange(256, dtype=np.uint8).reshape(1, 256)
+            white = np.full_like(ramp, 255)
+            self.lut = cv2.addWeighted(ramp, 1 - alpha, white, alpha, 0)
+        else:
+            self.white = np.full(shape, 255, dtype=np.uint8)
+        self.buffer = np.empty(shape, dtype=np.uint8)
 
-        # Apply current mode only to ROI
-        mode = self.current_mode
-        if mode == "normal":
-            processed_roi = roi
-        elif mode == "inverted":
-            processed_roi = cv2.bitwise_not(roi)
-        elif mode == "vein":
-            processed_roi = self._apply_vein_detection(roi)
+    def blend(self, frame, out=None):
+        """Blend frame with white into out (defaults to the reused buffer)."""
+        if out is None:
+            out = self.buffer
+        if self.method == "lut":
+            cv2.LUT(frame, self.lut, dst=out)
         else:
-            processed_roi = roi
+            cv2.addWeighted(frame, 1 - self.alpha, self.white, self.alpha, 0, dst=out)
+        return out
 
-        # Paste back ROI into blended output
-        output[y1:y2, x1:x2] = processed_roi
-        return output
+    def roi(self, frame):
+        return frame[self.roi_slice]
 
 
 # =========================
 # OpenCV Camera Wrapper
 # =========================
 class CameraWrapper(ModeMixin, CameraInterface):
-    def __init__(self, source=0, mode="normal"):
-        ModeMixin.__init__(self, mode)
+    """
+    buffer_size/fourcc/size/fps: cv2.VideoCapture properties applied when
+    set (e.g. fourcc="MJPG" vs "YUYV", buffer_size=1 for low latency).
+    grabber: keep grab()-ing on a background thread so the driver queue
+    never fills with stale frames; capture() then retrieve()s (decodes)
+    only the newest grabbed frame.
+    """
+
+    def __init__(self, source=0, mode="normal", rotation=0, grabber=False,
+                 buffer_size=None, fourcc=None, size=None, fps=None):
+        ModeMixin.__init__(self, mode, rotation)
         self.cap = cv2.VideoCapture(source)
+        if buffer_size is not None:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if size:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
 
-    def read(self):
+        self._grabber = None
+        if grabber and self.cap.isOpened():
+            # _cap_lock serializes grab()/retrieve()/release() on the capture;
+            # _cond guards the sequence state and is never held across them
+            self._cap_lock = threading.Lock()
+            self._cond = threading.Condition()
+            self._grab_seq = 0
+            self._grab_time = None
+            self._read_seq = 0
+            self._grab_failed = False
+            self._reader_waiting = False
+            self._grabbing = True
+            self._grabber = threading.Thread(target=self._grab_loop, name="grabber", daemon=True)
+            self._grabber.start()
+
+    def _grab_loop(self):
+        while self._grabbing:
+            with self._cond:
+                # Let a waiting reader retrieve the unread frame before
+                # grabbing over it
+                while (self._grabbing and self._reader_waiting
+                       and self._grab_seq > self._read_seq):
+                    self._cond.wait(0.1)
+            if not self._grabbing:
+                break
+            with self._cap_lock:
+                ok = self.cap.grab()
+                with self._cond:
+                    if ok:
+                        self._grab_seq += 1
+                        self._grab_time = time.monotonic()
+                    self._grab_failed = not ok
+                    self._cond.notify_all()
+            if not ok:
+                time.sleep(0.01)
+
+    def capture(self, out=None):
         if not self.cap.isOpened():
             return False, None
-        ret, frame = self.cap.read()
+        if self._grabber is not None:
+            return self._retrieve_latest(out)
+        ret, frame = self.cap.read(out)
         if not ret:
             return ret, None
-        return True, self._apply_mode(frame)
+        self.last_capture_time = time.monotonic()
+        return True, frame
+
+    def _retrieve_latest(self, out):
+        with self._cond:
+            # The grabber yields to us after its current grab() as long as
+            # there is an unread frame, instead of grabbing over it
+            self._reader_waiting = True
+            while (self._grabbing and self._grab_seq == self._read_seq
+                   and not self._grab_failed):
+                self._cond.wait(0.1)
+            if not self._grabbing or self._grab_seq == self._read_seq:
+                self._reader_waiting = False
+                self._cond.notify_all()
+                return False, None
+        try:
+            with self._cap_lock:
+                with self._cond:
+                    # Whatever the last grab() left, possibly newer than above
+                    seq, grab_time = self._grab_seq, self._grab_time
+                ret, frame = self.cap.retrieve(out)
+        finally:
+            with self._cond:
+                self._read_seq = seq
+                self._reader_waiting = False
+                self._cond.notify_all()
+        if not ret:
+            return False, None
+        self.last_capture_time = grab_time
+        return True, frame
 
     def release(self):
-        if self.cap.isOpened():
+        if self._grabber is not None:
+            with self._cond:
+                self._grabbing = False
+                self._cond.notify_all()
+            self._grabber.join(timeout=1.0)
+            self._grabber = None
+            # Still inside a slow grab() after the timeout: wait for it
+            with self._cap_lock:
+                self.cap.release()
+        elif self.cap.isOpened():
             self.cap.release()
 
 
@@ -125,25 +386,206 @@ class CameraWrapper(ModeMixin, CameraInterface):
 # Raspberry Pi Picamera2 Wrapper
 # =========================
 class Picamera2Wrapper(ModeMixin, CameraInterface):
-    def __init__(self, src=0, mode="normal"):
-        if Picamera2 is None:
+    """
+    luma_vein: also configure a YUV420 "lores" stream of the same size and,
+    in vein mode, feed its Y plane straight into CLAHE. The frame is then
+    returned single-channel (grayscale) instead of 3-channel BGR.
+
+    size/format/buffer_count: main stream configuration. Set size to the
+    display area so frames need no software rescale.
+    fps / frame_duration_limits: fix the frame rate (FrameDurationLimits in
+    microseconds; fps is the shorthand for min == max).
+    sensor_mode: "auto" picks the sensor mode that best covers size (and
+    fps), an int selects camera.sensor_modes[i], None leaves it to libcamera.
+    rotation: 0 or 180, applied by libcamera (Transform(hflip=1, vflip=1))
+    at no CPU cost; falls back to a software flip without libcamera.
+    backend: where Picamera2, MappedArray and Transform come from (default:
+    the installed picamera2/libcamera), e.g. fake_picamera2.backend().
+    """
+
+    # Both are B, G, R(, X) in memory, which is what the rest of the
+    # pipeline expects
+    formats = ("RGB888", "XRGB8888")
+
+    def __init__(self, src=0, mode="normal", luma_vein=True, size=(640, 480),
+                 format="RGB888", buffer_count=None, fps=None,
+                 frame_duration_limits=None, sensor_mode="auto", rotation=0,
+                 backend=None):
+        if backend is None:
+            backend = sys.modules[__name__]
+        if backend.Picamera2 is None:
             raise RuntimeError("Picamera2 library not available")
+        if format not in self.formats:
+            raise ValueError(f"Unsupported format {format}, expected one of {self.formats}")
         ModeMixin.__init__(self, mode)
-        self.camera = Picamera2()
-        config = self.camera.create_preview_configuration(
-            main={"format": "RGB888", "size": (640, 480)}
+        self._mapped_array = backend.MappedArray
+        self._transform_type = backend.Transform
+        self.software_rotation = self._transform_type is None
+        self.camera = backend.Picamera2()
+        size = tuple(size)
+        self.luma_vein = luma_vein
+
+        kwargs = {}
+        if buffer_count is not None:
+            kwargs["buffer_count"] = buffer_count
+        if fps and frame_duration_limits is None:
+            frame_us = int(1_000_000 / fps)
+            frame_duration_limits = (frame_us, frame_us)
+        if frame_duration_limits is not None:
+            kwargs["controls"] = {"FrameDurationLimits": tuple(frame_duration_limits)}
+
+        self.sensor_mode = None
+        if sensor_mode == "auto":
+            self.sensor_mode = select_sensor_mode(self.camera.sensor_modes, size, fps)
+        elif sensor_mode is not None:
+            self.sensor_mode = self.camera.sensor_modes[sensor_mode]
+        if self.sensor_mode is not None:
+            kwargs["raw"] = {
+                "size": self.sensor_mode["size"],
+                "format": self.sensor_mode["unpacked"],
+            }
+
+        if self._transform_type is not None:
+            kwargs["transform"] = self._transform(rotation)
+            self.rotation = rotation
+        else:
+            ModeMixin.set_rotation(self, rotation)
+        self._pending_rotation = None
+        self._rotation_lock = threading.Lock()
+        # Zoom of the last captured frame, from its ScalerCrop metadata
+        self._frame_zoom = 1.0
+
+        lores = {"format": "YUV420", "size": size} if luma_vein else None
+        self.config = self.camera.create_preview_configuration(
+            main={"format": format, "size": size}, lores=lores, **kwargs
         )
-        self.camera.configure(config)
+        self.camera.configure(self.config)
         self.camera.start()
 
-    def read(self):
+    def _transform(self, rotation):
+        flip = int(rotation == 180)
+        return self._transform_type(hflip=flip, vflip=flip)
+
+    def set_rotation(self, rotation):
+        """
+        Changing the libcamera transform needs a stop/configure/start, so
+        it is left to the capture thread (next capture()) instead of
+        blocking the caller.
+        """
+        if rotation not in (0, 180):
+            raise ValueError(f"Unsupported rotation: {rotation}")
+        if self._transform_type is None:
+            ModeMixin.set_rotation(self, rotation)
+        else:
+            with self._rotation_lock:
+                self._pending_rotation = rotation
+
+    def _apply_pending_rotation(self):
+        """
+        Reconfigure for the requested transform (capture thread). If the
+        camera rejects it, it is restarted with the transform it had and the
+        display keeps covering the difference. The request is only cleared
+        once the camera runs again, so a failed restart is retried on the
+        next capture.
+        """
+        rotation = self._pending_rotation
+        if rotation is not None and rotation != self.rotation:
+            self.camera.stop()
+            try:
+                self.config["transform"] = self._transform(rotation)
+                self.camera.configure(self.config)
+            except Exception as e:
+                print(f"Could not apply rotation {rotation}, keeping {self.rotation}: {e}")
+                self.config["transform"] = self._transform(self.rotation)
+                self.camera.configure(self.config)
+            else:
+                self.rotation = rotation
+            self.camera.start()
+            if self.hardware_zoom != 1.0:
+                self.set_zoom(self.hardware_zoom)  # controls reset on configure
+        with self._rotation_lock:
+            # A newer request that came in meanwhile is kept for the next capture
+            if self._pending_rotation == rotation:
+                self._pending_rotation = None
+
+    def _capture_into(self, stream, out):
+        """
+        Copy the next frame of a stream into out (no allocation). For
+        YUV420 only the Y plane (the first `height` rows) is copied.
+        Returns a new array when out does not fit.
+        """
+        w, h = self.camera.camera_config[stream]["size"]
+        with self.camera.captured_request() as request:
+            self._frame_zoom = self._zoom_of(request)
+            with self._mapped_array(request, stream) as mapped:
+                src = mapped.array[:h, :w]
+                if out is None or out.shape != src.shape:
+                    return src.copy()
+                out[...] = src
+                return out
+
+    def _zoom_of(self, request):
+        """
+        Zoom actually applied to a request: ScalerCrop takes effect a few
+        frames after set_controls(), so hardware_zoom can be ahead of it.
+        """
+        try:
+            crop = request.get_metadata()["ScalerCrop"]
+            _, _, w, h = self._base_crop()
+            return max(1.0, round(min(w / crop[2], h / crop[3]), 2))
+        except Exception:
+            return self.hardware_zoom
+
+    def _base_crop(self):
+        """
+        ScalerCrop at zoom 1.0: the sensor mode's crop limits (the control's
+        default) trimmed, centered, to the main stream's aspect ratio, as
+        the ISP crops by default.
+        """
+        min_crop, max_crop, default_crop = self.camera.camera_controls["ScalerCrop"]
+        x, y, w, h = default_crop or max_crop
+        out_w, out_h = self.camera.camera_config["main"]["size"]
+        if w * out_h > h * out_w:
+            crop_w = h * out_w // out_h
+            return x + (w - crop_w) // 2, y, crop_w, h
+        crop_h = w * out_h // out_w
+        return x, y + (h - crop_h) // 2, w, crop_h
+
+    def frame_view(self):
+        return self.rotation, self._frame_zoom
+
+    def capture(self, out=None):
         try:
-            frame = self.camera.capture_array()
-            return True, self._apply_mode(frame)
+            if self._pending_rotation is not None:
+                self._apply_pending_rotation()
+            if self.luma_vein and self.current_mode == "vein":
+                frame = self._capture_into("lores", out)
+            else:
+                frame = self._capture_into("main", out)
+            return True, frame
         except Exception as e:
             print(f"Error capturing frame: {e}")
             return False, None
 
+    def set_zoom(self, factor):
+        """
+        Center zoom through the ISP ScalerCrop control: the camera delivers
+        the cropped region at full output resolution, at no CPU cost.
+        """
+        try:
+            # Same aspect ratio as the stream; factor 1.0 gives it back exactly
+            x, y, w, h = self._base_crop()
+            crop_w = int(w / factor)
+            crop_h = int(h / factor)
+            crop = (x + (w - crop_w) // 2, y + (h - crop_h) // 2, crop_w, crop_h)
+            self.camera.set_controls({"ScalerCrop": crop})
+        except Exception as e:
+            print(f"ScalerCrop zoom unavailable, using software zoom: {e}")
+            self.hardware_zoom = 1.0
+            return False
+        self.hardware_zoom = factor
+        return True
+
     def release(self):
         try:
             self.camera.stop()
@@ -151,21 +593,77 @@ class Picamera2Wrapper(ModeMixin, CameraInterface):
             print(f"Error releasing camera: {e}")
 
 
+def select_sensor_mode(sensor_modes, size, fps=None):
+    """
+    Pick the sensor mode to scale down from for an output of `size`:
+    matching aspect ratio first, then the smallest mode that still covers
+    the output (and reaches fps), which is usually the fastest one.
+    """
+    if not sensor_modes:
+        return None
+    w, h = size
+    aspect = w / h
+
+    def covers(mode):
+        mw, mh = mode["size"]
+        return mw >= w and mh >= h
+
+    def score(mode):
+        mw, mh = mode["size"]
+        return (round(abs(mw / mh - aspect), 1), mw * mh, -mode.get("fps", 0))
+
+    covering = [m for m in sensor_modes if covers(m)]
+    fast_enough = [m for m in covering if not fps or m.get("fps", 0) >= fps]
+    if fast_enough:
+        return min(fast_enough, key=score)
+    if covering:
+        return max(covering, key=lambda m: m.get("fps", 0))
+    # Nothing covers the request: take the biggest mode and let the ISP upscale
+    return max(sensor_modes, key=lambda m: m["size"][0] * m["size"][1])
+
+
 # =========================
 # Image Wrapper (Static Image)
 # =========================
 class ImageWrapper(ModeMixin, CameraInterface):
-    def __init__(self, src, mode="normal"):
-        ModeMixin.__init__(self, mode)
+    """A single still image served as a camera; fps=None serves it unpaced."""
+
+    def __init__(self, src, mode="normal", rotation=0, fps=30):
+        ModeMixin.__init__(self, mode, rotation)
         self.image = cv2.imread(src, cv2.IMREAD_COLOR)
         self.loaded = self.image is not None
+        self.pacer = FramePacer(fps)
 
-    def read(self):
-        time.sleep(0.03)  # simulate delay
+    def capture(self, out=None):
+        self.pacer.wait()  # simulate the camera frame interval
         if not self.loaded:
             return False, None
-        return True, self._apply_mode(self.image.copy())
+        return True, self.image
 
     def release(self):
         self.image = None
         self.loaded = False
+
+
+# =========================
+# Frame Pacer
+# =========================
+class FramePacer:
+    """
+    Sleeps so that successive wait() calls are 1/fps apart (fps None or 0:
+    no pacing). Deadlines are absolute, so processing time is absorbed,
+    and a late caller is not made to burst to catch up.
+    """
+
+    def __init__(self, fps=None):
+        self.period = 1.0 / fps if fps else 0.0
+        self._next = None
+
+    def wait(self):
+        if not self.period:
+            return
+        now = time.monotonic()
+        if self._next is not None and now < self._next:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.period
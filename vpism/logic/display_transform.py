@@ -0,0 +1,72 @@
+import cv2
+
+
+# =========================
+# Display Transform
+# =========================
+def fit_size(w, h, target_w, target_h):
+    """Size of (w, h) scaled to fit the target, like Qt.KeepAspectRatio."""
+    scaled_w = target_h * w // h
+    if scaled_w <= target_w:
+        return max(scaled_w, 1), target_h
+    return target_w, max(target_w * h // w, 1)
+
+
+def crop_rect(w, h, zoom=1.0, rotation=0):
+    """
+    Center crop (x, y, crop_w, crop_h) for a zoom factor, in the coordinates
+    of the unrotated frame. With rotation=180 the window is mirrored so it
+    matches cropping the rotated frame, which is what the GUI used to do.
+    """
+    crop_w = int(w / zoom)
+    crop_h = int(h / zoom)
+    x = (w - crop_w) // 2
+    y = (h - crop_h) // 2
+    if rotation == 180:
+        x = w - crop_w - x
+        y = h - crop_h - y
+    return x, y, crop_w, crop_h
+
+
+def output_shape(shape, size, zoom=1.0):
+    """Shape of transform_frame()'s result for a frame of the given shape."""
+    h, w = shape[:2]
+    _, _, crop_w, crop_h = crop_rect(w, h, zoom)
+    out_w, out_h = fit_size(crop_w, crop_h, *size)
+    return (out_h, out_w) + tuple(shape[2:])
+
+
+def transform_frame(frame, size, rotation=0, zoom=1.0, out=None):
+    """
+    Rotate (0/180), center-crop for zoom and fit into size=(w, h) with a
+    single resample.
+
+    out: destination shaped like output_shape(). Without it the frame is
+    returned untouched when nothing is needed, and new arrays are
+    allocated otherwise.
+    """
+    if rotation not in (0, 180):
+        raise ValueError(f"Unsupported rotation: {rotation}")
+
+    h, w = frame.shape[:2]
+    x, y, crop_w, crop_h = crop_rect(w, h, zoom, rotation)
+    if (crop_w, crop_h) != (w, h):
+        frame = frame[y:y + crop_h, x:x + crop_w]
+
+    out_w, out_h = fit_size(crop_w, crop_h, *size)
+    if (out_w, out_h) != (crop_w, crop_h):
+        upscale = out_w > crop_w
+        frame = cv2.resize(
+            frame, (out_w, out_h), dst=out,
+            interpolation=cv2.INTER_LINEAR if upscale else cv2.INTER_AREA
+        )
+    elif out is not None:
+        if rotation == 180:
+            return cv2.flip(frame, -1, dst=out)
+        out[...] = frame
+        return out
+
+    if rotation == 180:
+        # Flip after the resize so it runs on the smaller image
+        frame = cv2.flip(frame, -1, dst=out)
+    return frame
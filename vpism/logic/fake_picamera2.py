@@ -0,0 +1,515 @@
+"""
+Simulated stand-in for picamera2 (and libcamera.Transform), so that
+Picamera2Wrapper and the production VideoThread path run on machines
+without a Pi camera:
+
+    from vpism.logic import fake_picamera2
+    camera = Picamera2Wrapper(backend=fake_picamera2.backend(jitter=0.002))
+
+It covers the subset of the API the wrapper uses - sensor_modes,
+create_*_configuration(), configure(), start()/stop(), set_controls(),
+camera_controls, camera_config, captured_request() and MappedArray - and
+behaves like the real thing where it matters for performance:
+
+  - frames arrive on a sensor clock, one FrameDuration apart (from the
+    sensor mode and FrameDurationLimits, or a fixed frame_interval), with
+    optional Gaussian delivery jitter
+  - a frame is only produced into a free buffer (buffer_count); when the
+    application holds on to them, the frame is dropped
+  - captured_request() waits for a frame newer than the last one taken
+  - the ISP is emulated per frame: ScalerCrop crop, resize to each
+    stream's size, Transform flips and format conversion (RGB888,
+    BGR888, XRGB8888, XBGR8888, YUV420)
+  - controls take effect from the next frame
+
+The rendering runs on the fake's own thread, so it costs CPU time the
+real ISP would not.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+# Modes of an IMX219 (camera module v2), as reported by Picamera2.sensor_modes
+PIXEL_ARRAY_SIZE = (3280, 2464)
+SENSOR_MODES = [
+    {"format": "SRGGB10_CSI2P", "unpacked": "SRGGB10", "bit_depth": 10,
+     "size": (640, 480), "fps": 103.33, "crop_limits": (1000, 752, 1280, 960)},
+    {"format": "SRGGB10_CSI2P", "unpacked": "SRGGB10", "bit_depth": 10,
+     "size": (1640, 1232), "fps": 41.85, "crop_limits": (0, 0, 3280, 2464)},
+    {"format": "SRGGB10_CSI2P", "unpacked": "SRGGB10", "bit_depth": 10,
+     "size": (1920, 1080), "fps": 47.57, "crop_limits": (680, 692, 1920, 1080)},
+    {"format": "SRGGB10_CSI2P", "unpacked": "SRGGB10", "bit_depth": 10,
+     "size": (3280, 2464), "fps": 21.19, "crop_limits": (0, 0, 3280, 2464)},
+]
+
+MAIN_FORMATS = ("RGB888", "BGR888", "XRGB8888", "XBGR8888", "YUV420")
+LORES_FORMATS = ("YUV420",)
+MIN_CROP = (0, 0, 64, 64)
+MAX_FRAME_DURATION = 1_000_000  # us
+
+
+# =========================
+# libcamera.Transform
+# =========================
+class Transform:
+    def __init__(self, hflip=0, vflip=0, transpose=0):
+        if transpose:
+            raise ValueError("Transpose is not supported by the Pi ISP")
+        self.hflip = int(bool(hflip))
+        self.vflip = int(bool(vflip))
+        self.transpose = 0
+
+    def __eq__(self, other):
+        return (isinstance(other, Transform)
+                and (self.hflip, self.vflip) == (other.hflip, other.vflip))
+
+    def __repr__(self):
+        name = {(0, 0): "identity", (1, 0): "hflip", (0, 1): "vflip", (1, 1): "hvflip"}
+        return f"<libcamera.Transform '{name[(self.hflip, self.vflip)]}'>"
+
+
+# =========================
+# Requests
+# =========================
+class CompletedRequest:
+    """One frame's buffers (stream name -> array) and metadata."""
+
+    def __init__(self, camera, slot, metadata):
+        self._camera = camera
+        self._slot = slot
+        self.metadata = metadata
+
+    def make_array(self, name):
+        return self._slot.arrays[name].copy()
+
+    def get_metadata(self):
+        return dict(self.metadata)
+
+    def release(self):
+        if self._slot is not None:
+            self._camera._release_slot(self._slot)
+            self._slot = None
+
+
+class MappedArray:
+    """Access to a request's buffer without a copy; valid inside the with block."""
+
+    def __init__(self, request, stream, reshape=True, write=True):
+        self.request = request
+        self.stream = stream
+        self.array = None
+
+    def __enter__(self):
+        self.array = self.request._slot.arrays[self.stream]
+        return self
+
+    def __exit__(self, *exc):
+        self.array = None
+
+
+class _Slot:
+    __slots__ = ("arrays", "held", "seq")
+
+    def __init__(self):
+        self.arrays = {}
+        self.held = 0
+        self.seq = -1
+
+
+# =========================
+# Picamera2
+# =========================
+class Picamera2:
+    """
+    frame_interval: seconds between frames; None follows the sensor mode
+    and FrameDurationLimits like the real camera.
+    jitter: standard deviation (seconds) of the delivery time of each frame.
+    scene: image path or BGR array the sensor "sees"; a synthetic forearm
+    with veins by default. A bar moving one step per frame is drawn on top
+    so consecutive frames differ.
+    """
+
+    def __init__(self, camera_num=0, frame_interval=None, jitter=0.0, scene=None,
+                 sensor_modes=None, seed=None):
+        self.camera_num = camera_num
+        self.frame_interval = frame_interval
+        self.jitter = jitter
+        self.sensor_modes = [dict(m) for m in (sensor_modes or SENSOR_MODES)]
+        self.camera_properties = {"Model": "fake_imx219", "PixelArraySize": PIXEL_ARRAY_SIZE}
+        self.camera_config = None
+        self.camera_controls = self._controls_for(self.sensor_modes[0])
+        self.started = False
+
+        self._scene = _load_scene(scene)
+        self._scene_scale = self._scene.shape[1] / PIXEL_ARRAY_SIZE[0]
+        self._random = random.Random(seed)
+        self._mode = self.sensor_modes[0]
+        self._transform = Transform()
+        self._controls = {}
+        self._slots = []
+        self._stages = {}
+
+        self._cond = threading.Condition()
+        self._latest = None
+        self._taken_seq = -1
+        self._running = False
+        self._thread = None
+
+        self.frames = 0   # frames delivered by the sensor
+        self.dropped = 0  # frames lost because no buffer was free
+
+    # ----------------------------
+    # Configuration
+    # ----------------------------
+    def create_preview_configuration(self, main=None, lores=None, raw=None, transform=None,
+                                     buffer_count=4, controls=None, **kwargs):
+        return self._create_configuration("preview", main, lores, raw, transform,
+                                          buffer_count, controls, (640, 480))
+
+    def create_video_configuration(self, main=None, lores=None, raw=None, transform=None,
+                                   buffer_count=6, controls=None, **kwargs):
+        return self._create_configuration("video", main, lores, raw, transform,
+                                          buffer_count, controls, (1280, 720))
+
+    def create_still_configuration(self, main=None, lores=None, raw=None, transform=None,
+                                   buffer_count=1, controls=None, **kwargs):
+        return self._create_configuration("still", main, lores, raw, transform,
+                                          buffer_count, controls, PIXEL_ARRAY_SIZE)
+
+    def _create_configuration(self, use_case, main, lores, raw, transform, buffer_count,
+                              controls, default_size):
+        main = {"format": "XBGR8888", "size": default_size, **(main or {})}
+        if lores is not None:
+            lores = {"format": "YUV420", "size": main["size"], **lores}
+        return {
+            "use_case": use_case,
+            "transform": transform or Transform(),
+            "buffer_count": buffer_count,
+            "main": main,
+            "lores": lores,
+            "raw": dict(raw) if raw else None,
+            "controls": dict(controls or {}),
+        }
+
+    def configure(self, config=None):
+        if self.started:
+            raise RuntimeError("Camera must be stopped before configuring")
+        if config is None:
+            config = self.create_preview_configuration()
+        main, lores = config["main"], config.get("lores")
+        if main["format"] not in MAIN_FORMATS:
+            raise ValueError(f"Unsupported main format {main['format']}")
+        if lores is not None:
+            if lores["format"] not in LORES_FORMATS:
+                raise ValueError(f"Unsupported lores format {lores['format']}")
+            if lores["size"][0] > main["size"][0] or lores["size"][1] > main["size"][1]:
+                raise ValueError("lores stream must not be larger than main")
+
+        self._mode = self._pick_mode(config.get("raw"), main["size"])
+        self._transform = config.get("transform") or Transform()
+        self.camera_controls = self._controls_for(self._mode)
+        self._controls = {
+            "ScalerCrop": self._default_crop(main["size"]),
+            "FrameDurationLimits": self.camera_controls["FrameDurationLimits"][:2],
+        }
+        self._validate_controls(config.get("controls") or {})
+        self._controls.update(config.get("controls") or {})
+
+        streams = {"main": main}
+        if lores is not None:
+            streams["lores"] = lores
+        self._slots = [_Slot() for _ in range(max(1, config.get("buffer_count") or 1))]
+        for slot in self._slots:
+            for name, stream in streams.items():
+                slot.arrays[name] = np.empty(_buffer_shape(stream), dtype=np.uint8)
+        self._stages = {}
+        self.camera_config = {
+            **config,
+            "main": {**main, "size": tuple(main["size"])},
+            "lores": {**lores, "size": tuple(lores["size"])} if lores else None,
+            "raw": {"format": self._mode["unpacked"], "size": self._mode["size"]},
+            "sensor": {"output_size": self._mode["size"], "bit_depth": self._mode["bit_depth"]},
+        }
+
+    def _pick_mode(self, raw, size):
+        if raw and raw.get("size"):
+            for mode in self.sensor_modes:
+                if tuple(mode["size"]) == tuple(raw["size"]):
+                    return mode
+            raise ValueError(f"No sensor mode of size {raw['size']}")
+        # Like libcamera: the smallest mode that covers the output
+        covering = [m for m in self.sensor_modes
+                    if m["size"][0] >= size[0] and m["size"][1] >= size[1]]
+        if not covering:
+            return max(self.sensor_modes, key=lambda m: m["size"][0] * m["size"][1])
+        return min(covering, key=lambda m: m["size"][0] * m["size"][1])
+
+    @staticmethod
+    def _controls_for(mode):
+        min_frame_us = int(1_000_000 / mode["fps"])
+        full = (0, 0) + PIXEL_ARRAY_SIZE
+        return {
+            "ScalerCrop": (MIN_CROP, full, mode["crop_limits"]),
+            "FrameDurationLimits": (min_frame_us, MAX_FRAME_DURATION, min_frame_us),
+            "ExposureTime": (75, 66_666_666, 20_000),
+            "AnalogueGain": (1.0, 10.666, 1.0),
+            "AeEnable": (False, True, True),
+            "AwbEnable": (False, True, True),
+            "Brightness": (-1.0, 1.0, 0.0),
+            "Contrast": (0.0, 32.0, 1.0),
+        }
+
+    def _default_crop(self, size):
+        """The mode's crop limits, trimmed to the output aspect ratio."""
+        x, y, w, h = self._mode["crop_limits"]
+        if w * size[1] > h * size[0]:
+            crop_w = h * size[0] // size[1]
+            return x + (w - crop_w) // 2, y, crop_w, h
+        crop_h = w * size[1] // size[0]
+        return x, y + (h - crop_h) // 2, w, crop_h
+
+    # ----------------------------
+    # Controls
+    # ----------------------------
+    def set_controls(self, controls):
+        self._validate_controls(controls)
+        with self._cond:
+            self._controls.update(controls)
+
+    def _validate_controls(self, controls):
+        for name in controls:
+            if name not in self.camera_controls:
+                raise RuntimeError(f"Control {name} is not advertised by libcamera")
+
+    def _clamped_crop(self, crop):
+        """ScalerCrop is clipped to the mode's crop limits, like the ISP does."""
+        lx, ly, lw, lh = self._mode["crop_limits"]
+        x, y, w, h = (int(v) for v in crop)
+        w = min(max(w, MIN_CROP[2]), lw)
+        h = min(max(h, MIN_CROP[3]), lh)
+        x = min(max(x, lx), lx + lw - w)
+        y = min(max(y, ly), ly + lh - h)
+        return x, y, w, h
+
+    def _frame_duration_us(self, controls):
+        if self.frame_interval is not None:
+            return int(self.frame_interval * 1_000_000)
+        low, high = controls["FrameDurationLimits"]
+        min_frame_us = self.camera_controls["FrameDurationLimits"][0]
+        return min(max(low, min_frame_us), max(high, min_frame_us))
+
+    # ----------------------------
+    # Running
+    # ----------------------------
+    def start(self, config=None, show_preview=False):
+        if config is not None or self.camera_config is None:
+            self.configure(config)
+        if self.started:
+            return
+        self.started = True
+        self._running = True
+        self._latest = None
+        self._taken_seq = -1
+        self._thread = threading.Thread(target=self._sensor_loop, name="fake-picamera2",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.started:
+            return
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+        self.started = False
+
+    def close(self):
+        self.stop()
+
+    def _sensor_loop(self):
+        seq = 0
+        deadline = time.monotonic()
+        while self._running:
+            with self._cond:
+                controls = dict(self._controls)
+            duration_us = self._frame_duration_us(controls)
+            interval = duration_us / 1_000_000
+            deadline += interval
+            now = time.monotonic()
+            if now > deadline + interval:
+                deadline = now  # fell behind (e.g. slow rendering): don't burst
+            delay = deadline - now
+            if self.jitter:
+                jitter = self._random.gauss(0.0, self.jitter)
+                delay += max(-interval / 2, min(interval / 2, jitter))
+            if delay > 0:
+                time.sleep(delay)
+
+            slot = self._free_slot()
+            self.frames += 1
+            if slot is None:
+                self.dropped += 1
+                continue
+            crop = self._clamped_crop(controls["ScalerCrop"])
+            self._render(slot, crop, seq)
+            metadata = {
+                "SensorTimestamp": time.monotonic_ns(),
+                "FrameDuration": duration_us,
+                "ScalerCrop": crop,
+                "ExposureTime": controls.get("ExposureTime", min(duration_us, 20_000)),
+            }
+            with self._cond:
+                slot.seq = seq
+                self._latest = (slot, metadata)
+                self._cond.notify_all()
+            seq += 1
+
+    def _free_slot(self):
+        """A buffer that is neither held by the application nor the newest frame."""
+        with self._cond:
+            newest = self._latest[0] if self._latest else None
+            for slot in self._slots:
+                if not slot.held and slot is not newest:
+                    return slot
+        return None
+
+    def _release_slot(self, slot):
+        with self._cond:
+            slot.held -= 1
+
+    def _render(self, slot, crop, seq):
+        """The ISP: crop, scale, flip and convert into every stream of a slot."""
+        scale = self._scene_scale
+        x, y, w, h = (int(round(v * scale)) for v in crop)
+        region = self._scene[y:y + max(h, 1), x:x + max(w, 1)]
+        for name, array in slot.arrays.items():
+            stream = self.camera_config[name]
+            size = tuple(stream["size"])
+            # Streams of the same size share one scaled image per frame
+            stage = self._stages.get(size)
+            if stage is None:
+                stage = self._stages[size] = [np.empty((size[1], size[0], 3), np.uint8), None]
+            bgr = stage[0]
+            if stage[1] != seq:
+                stage[1] = seq
+                upscale = size[0] > region.shape[1]
+                cv2.resize(region, size, dst=bgr,
+                           interpolation=cv2.INTER_LINEAR if upscale else cv2.INTER_AREA)
+                bar_x = (seq * 4) % size[0]
+                cv2.rectangle(bgr, (bar_x, 0), (bar_x + 3, size[1] - 1), (255, 255, 255), -1)
+                flip = _flip_code(self._transform)
+                if flip is not None:
+                    cv2.flip(bgr, flip, dst=bgr)
+            _convert(bgr, stream["format"], array)
+
+    def capture_request(self, flush=None, wait=None):
+        """Next frame newer than the last one taken; release() it when done."""
+        if not self.started:
+            raise RuntimeError("Camera must be started before capturing")
+        deadline = None if wait is None else time.monotonic() + wait
+        with self._cond:
+            while self._latest is None or self._latest[0].seq <= self._taken_seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not self._running or (remaining is not None and remaining <= 0):
+                    raise TimeoutError("No frame from the fake camera")
+                self._cond.wait(remaining if remaining is not None else 0.5)
+            slot, metadata = self._latest
+            slot.held += 1
+            self._taken_seq = slot.seq
+        return CompletedRequest(self, slot, metadata)
+
+    @contextmanager
+    def captured_request(self, flush=None, wait=None):
+        request = self.capture_request(flush=flush, wait=wait)
+        try:
+            yield request
+        finally:
+            request.release()
+
+    def capture_array(self, name="main", wait=None):
+        with self.captured_request(wait=wait) as request:
+            return request.make_array(name)
+
+    def capture_metadata(self, wait=None):
+        with self.captured_request(wait=wait) as request:
+            return request.get_metadata()
+
+
+def backend(frame_interval=None, jitter=0.0, scene=None, seed=None):
+    """
+    Drop-in for Picamera2Wrapper(backend=...): the fake Picamera2 with these
+    settings, plus MappedArray and Transform.
+    """
+    def create(camera_num=0):
+        return Picamera2(camera_num, frame_interval=frame_interval, jitter=jitter,
+                         scene=scene, seed=seed)
+
+    return SimpleNamespace(Picamera2=create, MappedArray=MappedArray, Transform=Transform)
+
+
+# =========================
+# Helpers
+# =========================
+def _buffer_shape(stream):
+    w, h = stream["size"]
+    if stream["format"] == "YUV420":
+        return h * 3 // 2, w
+    if stream["format"] in ("XRGB8888", "XBGR8888"):
+        return h, w, 4
+    return h, w, 3
+
+
+def _flip_code(transform):
+    if transform.hflip and transform.vflip:
+        return -1
+    if transform.hflip:
+        return 1
+    if transform.vflip:
+        return 0
+    return None
+
+
+def _convert(bgr, fmt, out):
+    # RGB888/XRGB8888 are B, G, R(, X) in memory, BGR888/XBGR8888 R, G, B(, X)
+    if fmt == "RGB888":
+        out[...] = bgr
+    elif fmt == "BGR888":
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=out)
+    elif fmt == "XRGB8888":
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA, dst=out)
+    elif fmt == "XBGR8888":
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA, dst=out)
+    else:
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420, dst=out)
+
+
+def _load_scene(scene):
+    """The scene at half the pixel array resolution."""
+    size = (PIXEL_ARRAY_SIZE[0] // 2, PIXEL_ARRAY_SIZE[1] // 2)
+    if isinstance(scene, str):
+        image = cv2.imread(scene, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not read scene {scene}")
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    if scene is not None:
+        return cv2.resize(np.ascontiguousarray(scene), size, interpolation=cv2.INTER_AREA)
+
+    # Skin-toned gradient with a few dark, blurred vessels
+    w, h = size
+    shade = np.linspace(0.8, 1.0, h, dtype=np.float32)[:, None, None]
+    image = (np.array([120, 150, 200], dtype=np.float32) * shade).repeat(w, axis=1)
+    image = image.astype(np.uint8)
+    rng = np.random.default_rng(0)
+    xs = np.arange(0, w, 16)
+    for _ in range(6):
+        y0, amplitude, period = rng.integers(100, h - 100), rng.integers(20, 80), rng.integers(300, 900)
+        ys = y0 + amplitude * np.sin(xs * 2 * np.pi / period)
+        points = np.stack([xs, ys], axis=1).astype(np.int32)
+        cv2.polylines(image, [points], False, (90, 105, 140), int(rng.integers(6, 18)))
+    return cv2.GaussianBlur(image, (0, 0), 6)
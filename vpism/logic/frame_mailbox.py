@@ -0,0 +1,42 @@
+import threading
+
+
+# =========================
+# Frame Mailbox
+# =========================
+class FrameMailbox:
+    """
+    Single-slot, latest-frame-wins handoff between a producer thread and
+    the GUI. put() overwrites an untaken frame (counted as dropped), so
+    the consumer is never more than one frame behind.
+
+    on_drop: called (outside the lock) with every overwritten item, e.g. to
+    return its buffer to a pool.
+    """
+
+    def __init__(self, on_drop=None):
+        self._lock = threading.Lock()
+        self._on_drop = on_drop
+        self._item = None
+        self.posted = 0
+        self.taken = 0
+        self.dropped = 0
+
+    def put(self, item):
+        """Store item; True if the slot was empty (the consumer needs a wake-up)."""
+        with self._lock:
+            dropped, self._item = self._item, item
+            if dropped is not None:
+                self.dropped += 1
+            self.posted += 1
+        if dropped is not None and self._on_drop is not None:
+            self._on_drop(dropped)
+        return dropped is None
+
+    def take(self):
+        """Latest item, or None if nothing new arrived since the last take."""
+        with self._lock:
+            item, self._item = self._item, None
+            if item is not None:
+                self.taken += 1
+        return item
@@ -0,0 +1,237 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+from vpism.logic import metrics, tracing
+from vpism.logic.buffer_pool import BufferPool
+from vpism.logic.frame_stats import RateMeter, StageTimings
+
+
+# =========================
+# Frame Pipeline
+# =========================
+class FramePipeline:
+    """
+    Capture and mode processing on their own threads, so the frame rate is
+    set by the slowest stage instead of the sum of all of them:
+
+        capture thread -> bounded queue -> processing worker(s) -> reorder -> get()
+
+    The caller of get() is the display-conversion stage (VideoThread.run).
+    With more than one worker frames can finish out of order; get() hands
+    them back strictly by sequence number.
+
+    Capture and processed frames live in a BufferPool. Frames returned by
+    get() belong to the caller, who gives them back with release(). Each
+    frame carries the time.monotonic() at which it was captured, the
+    camera's frame_view() (rotation, zoom) at that moment, and with
+    keep_raw=True also the raw capture it was processed from (for saving).
+    """
+
+    # Reorder-buffer entry of a frame that is not delivered
+    _SKIPPED = (None, None, None, None)
+
+    def __init__(self, camera, workers=1, queue_size=2, pool=None, keep_raw=False):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.camera = camera
+        self.workers = workers
+        self.queue_size = queue_size
+        self.paused = False
+        self.keep_raw = keep_raw
+        self.pool = pool or BufferPool()
+
+        self._running = False
+        self._threads = []
+        self._capture_queue = queue.Queue(maxsize=queue_size)
+
+        # Reorder buffer: seq -> (frame, captured_at, raw, view); frame None marks a failure
+        self._done = {}
+        self._done_cond = threading.Condition()
+        self._next_seq = 0
+        self._max_pending = workers + queue_size
+        # Bumped on pause; frames captured before it are dropped, not shown
+        self._epoch = 0
+        # Worst case of same-shaped buffers in flight: capture side (1 being
+        # captured + queue + 1 per worker), processed side (1 per worker +
+        # reorder buffer) and the frame the caller holds
+        self.buffers_per_shape = 3 * workers + 2 * queue_size + 2
+        if keep_raw:
+            # Raw frames travel alongside the processed side
+            self.buffers_per_shape += 2 * workers + queue_size + 1
+
+        self.captured = 0
+        self.processed = 0
+        # "capture" (including waiting for the camera) and "process" times
+        self.timings = StageTimings(histogram=metrics.STAGE_SECONDS)
+        self.capture_rate = RateMeter()
+
+    def start(self):
+        self._running = True
+        self._threads = [threading.Thread(target=self._capture_loop, name="capture", daemon=True)]
+        for i in range(self.workers):
+            self._threads.append(
+                threading.Thread(target=self._process_loop, name=f"process-{i}", daemon=True)
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._running = False
+        with self._done_cond:
+            self._done_cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    # ----------------------------
+    # Stages
+    # ----------------------------
+    def _capture_loop(self):
+        seq = 0
+        shape = None
+        while self._running:
+            if self.paused:
+                time.sleep(0.01)
+                continue
+            # Capture into a pooled buffer shaped like the previous frame
+            out = self.pool.acquire(shape) if shape else None
+            epoch = self._epoch
+            started = time.perf_counter()
+            with tracing.span("capture"):
+                ret, frame = self.camera.capture(out=out)
+            capture_time = time.perf_counter() - started
+            captured_at = self.camera.last_capture_time or time.monotonic()
+            view = self.camera.frame_view()
+            if frame is not out and out is not None:
+                self.pool.release(out)
+                out = None
+            if not ret or not isinstance(frame, np.ndarray):
+                time.sleep(0.01)
+                continue
+            if frame.shape != shape:
+                shape = frame.shape
+                self.pool.reserve(shape, self.buffers_per_shape)
+            self.captured += 1
+            metrics.FRAMES_CAPTURED.inc()
+            self.timings.add("capture", capture_time)
+            self.capture_rate.tick()
+            # out is None when the camera handed back its own array
+            item = (seq, frame, out is not None, captured_at, view, epoch)
+            seq += 1
+            # Back-pressure: wait for a worker instead of growing the queue
+            while self._running:
+                try:
+                    self._capture_queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def _process_loop(self):
+        while self._running:
+            try:
+                seq, frame, pooled, captured_at, view, epoch = self._capture_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            out = self.pool.acquire(frame.shape)
+            started = time.perf_counter()
+            try:
+                result = self.camera.process(frame, out=out, rotation=view[0])
+                self.timings.add("process", time.perf_counter() - started)
+            except Exception as e:
+                print(f"Error processing frame: {e}")
+                self.pool.release(out)
+                result = None
+            raw = None
+            if self.keep_raw and result is not None:
+                if pooled:
+                    raw = frame
+                    pooled = False  # released with the processed frame
+                else:
+                    # The camera may reuse its own array; keep a pooled copy
+                    raw = self.pool.acquire(frame.shape)
+                    raw[...] = frame
+            if pooled:
+                self.pool.release(frame)
+            self._deliver(seq, (result, captured_at, raw, view), epoch)
+
+    def _deliver(self, seq, item, epoch):
+        with self._done_cond:
+            # Bound the reorder buffer, but never block the frame get() waits for
+            while (self._running and seq != self._next_seq
+                   and len(self._done) >= self._max_pending):
+                self._done_cond.wait(0.1)
+            if epoch != self._epoch and item[0] is not None:
+                # Captured before a pause: keep the slot, drop the frame
+                self.release(item[0], item[2])
+                item = self._SKIPPED
+            self._done[seq] = item
+            self._skip_ahead()
+            self.processed += 1
+            metrics.FRAMES_PROCESSED.inc()
+            self._done_cond.notify_all()
+
+    # ----------------------------
+    # Output (display stage)
+    # ----------------------------
+    def get(self, timeout=None):
+        """
+        Next (frame, captured_at, raw, view) in capture order, or None on
+        timeout/stop. raw is None unless keep_raw is set; view is the
+        (rotation, zoom) the frame was captured with.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._done_cond:
+            while self._running:
+                if self._next_seq in self._done:
+                    item = self._done.pop(self._next_seq)
+                    self._next_seq += 1
+                    self._done_cond.notify_all()
+                    if item[0] is None:
+                        continue  # failed in processing; skip its slot
+                    return item
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._done_cond.wait(remaining)
+        return None
+
+    def set_paused(self, paused):
+        """
+        Pause or resume capturing. Pausing drops the frames still queued,
+        in processing or waiting in the reorder buffer and gives their
+        buffers back to the pool, so resuming starts with a fresh capture.
+        """
+        with self._done_cond:
+            self.paused = paused
+            if not paused:
+                return
+            self._epoch += 1
+            while True:
+                try:
+                    seq, frame, pooled, _, _, _ = self._capture_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pooled:
+                    self.pool.release(frame)
+                self._done[seq] = self._SKIPPED
+            for seq, item in self._done.items():
+                if item[0] is not None:
+                    self.release(item[0], item[2])
+                    self._done[seq] = self._SKIPPED
+            self._skip_ahead()
+            self._done_cond.notify_all()
+
+    def _skip_ahead(self):
+        """Pass over dropped slots at the head of the reorder buffer (lock held)."""
+        while self._done.get(self._next_seq) is self._SKIPPED:
+            del self._done[self._next_seq]
+            self._next_seq += 1
+
+    def release(self, frame, raw=None):
+        """Give a frame (and its raw capture) returned by get() back to the pool."""
+        self.pool.release(frame)
+        if raw is not None:
+            self.pool.release(raw)
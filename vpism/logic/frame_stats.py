@@ -0,0 +1,110 @@
+"""
+Frame statistics fed from the capture, process and display threads on
+every frame. Like the metrics instruments, each thread records into its
+own cell (metrics.PerThread), so adding a sample takes no lock; readers
+(HUD, benchmarks) merge the cells.
+"""
+import collections
+import time
+
+from vpism.logic.metrics import PerThread
+
+
+# =========================
+# Latency Tracker
+# =========================
+class LatencyTracker:
+    """
+    Rolling window of latency samples (seconds) with percentile summaries.
+    The window is per feeding thread (normally just the GUI thread).
+    """
+
+    def __init__(self, window=300):
+        self._cells = PerThread(lambda: [collections.deque(maxlen=window), 0])
+
+    def add(self, seconds):
+        cell = self._cells.cell()
+        cell[0].append(seconds)
+        cell[1] += 1
+
+    @property
+    def count(self):
+        return sum(cell[1] for cell in list(self._cells.cells))
+
+    def percentiles(self, *points):
+        """Percentiles in milliseconds (None when there are no samples)."""
+        samples = sorted(s for cell in list(self._cells.cells) for s in cell[0].copy())
+        if not samples:
+            return [None for _ in points]
+        last = len(samples) - 1
+        return [samples[min(last, int(round(p / 100 * last)))] * 1000.0 for p in points]
+
+    def summary(self):
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        if p50 is None:
+            return "no samples"
+        return f"p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms over {self.count} frames"
+
+
+# =========================
+# Rate Meter
+# =========================
+class RateMeter:
+    """Events per second over the last `window` seconds (e.g. frame rates)."""
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self._cells = PerThread(collections.deque)
+
+    def tick(self):
+        now = time.monotonic()
+        times = self._cells.cell()
+        times.append(now)
+        # Only the owning thread removes from its cell
+        while now - times[0] > self.window:
+            times.popleft()
+
+    def rate(self):
+        now = time.monotonic()
+        times = sorted(t for cell in list(self._cells.cells) for t in cell.copy()
+                       if now - t <= self.window)
+        if len(times) < 2:
+            return 0.0
+        span = now - times[0]
+        return (len(times) - 1) / span if span > 0 else 0.0
+
+
+# =========================
+# Stage Timings
+# =========================
+class StageTimings:
+    """
+    Smoothed duration (exponential moving average) of each pipeline stage,
+    kept per thread and averaged over the threads (e.g. several workers)
+    when read.
+    histogram: optional metrics.Histogram labelled by stage that also gets
+    every sample.
+    """
+
+    def __init__(self, smoothing=0.1, histogram=None):
+        self.smoothing = smoothing
+        self.histogram = histogram
+        self._cells = PerThread(dict)
+
+    def add(self, stage, seconds):
+        if self.histogram is not None:
+            self.histogram.labels(stage).observe(seconds)
+        averages = self._cells.cell()
+        average = averages.get(stage)
+        if average is None:
+            averages[stage] = seconds
+        else:
+            averages[stage] = average + self.smoothing * (seconds - average)
+
+    def snapshot(self):
+        """{stage: milliseconds}"""
+        per_stage = collections.defaultdict(list)
+        for averages in list(self._cells.cells):
+            for stage, seconds in averages.copy().items():
+                per_stage[stage].append(seconds)
+        return {stage: sum(values) / len(values) * 1000.0 for stage, values in per_stage.items()}
@@ -0,0 +1,205 @@
+import collections
+import os
+import threading
+import time
+
+import cv2
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from vpism.logic import metrics, settings, tracing
+from vpism.logic.display_transform import crop_rect
+from vpism.logic.storage import ImageStore, store_from_env
+
+EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+
+class SaveRequest:
+    """
+    One save and what became of it (times are time.monotonic()).
+    outcome: "queued", "saved", "failed" or "dropped" (queue full).
+    paths: files written, processed frame first.
+    """
+
+    __slots__ = ("frame", "raw", "rotation", "zoom", "requested_at", "finished_at",
+                 "outcome", "paths", "error")
+
+    def __init__(self, frame, raw=None, rotation=0, zoom=1.0):
+        self.frame = frame
+        self.raw = raw
+        self.rotation = rotation
+        self.zoom = zoom
+        self.requested_at = time.monotonic()
+        self.finished_at = None
+        self.outcome = "queued"
+        self.paths = []
+        self.error = None
+
+
+def encode_params(codec="png", png_level=3, jpeg_quality=95, webp_quality=90, webp_lossless=False):
+    """(extension, cv2.imencode params) for a codec."""
+    if codec == "jpg":
+        codec = "jpeg"
+    if codec == "png":
+        return EXTENSIONS[codec], [cv2.IMWRITE_PNG_COMPRESSION, png_level]
+    if codec == "jpeg":
+        return EXTENSIONS[codec], [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+    if codec == "webp":
+        # OpenCV switches WebP to lossless for quality above 100
+        return EXTENSIONS[codec], [cv2.IMWRITE_WEBP_QUALITY, 101 if webp_lossless else webp_quality]
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+def prepare(frame, rotation=0, zoom=1.0):
+    """
+    The frame as shown on screen but at full resolution: the display's
+    remaining zoom crop and rotation, BGRX reduced to BGR.
+    """
+    h, w = frame.shape[:2]
+    x, y, crop_w, crop_h = crop_rect(w, h, zoom, rotation)
+    if (crop_w, crop_h) != (w, h):
+        frame = frame[y:y + crop_h, x:x + crop_w]
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    if rotation == 180:
+        frame = cv2.flip(frame, -1)
+    return frame
+
+
+# =========================
+# Image Writer
+# =========================
+class ImageWriter(QThread):
+    """
+    Encodes and writes saved frames on a background thread, so a tap on
+    save only costs the frame copy.
+
+    submit() queues a SaveRequest and returns at once. The queue holds at
+    most `max_pending` saves; past that new requests are refused (never
+    silently replacing an earlier capture) and reported as "dropped".
+    `saved` is emitted for every request, on the GUI thread when
+    connected from there. The thread runs at `nice` (Linux, per thread) so
+    encoding yields the CPU to the GUI and the camera pipeline. Files go
+    through `store` (naming, atomic writes, fsync batching).
+    """
+
+    saved = pyqtSignal(object)  # SaveRequest
+
+    def __init__(self, store=None, codec="png", max_pending=4, nice=10,
+                 parent=None, **codec_options):
+        super().__init__(parent)
+        self.store = store or ImageStore()
+        self.nice = nice
+        self.extension, self.params = encode_params(codec, **codec_options)
+        self.max_pending = max_pending
+        self.history = collections.deque(maxlen=50)
+        self._pending = collections.deque()
+        self._cond = threading.Condition()
+        self._running = True
+
+    def submit(self, request):
+        with self._cond:
+            self.history.append(request)
+            if len(self._pending) >= self.max_pending:
+                request.outcome = "dropped"
+            else:
+                self._pending.append(request)
+                metrics.SAVE_QUEUE_DEPTH.inc()
+                self._cond.notify_all()
+        if request.outcome == "dropped":
+            print("Save queue full, image not saved")
+            self.saved.emit(request)
+        return request
+
+    def wait_idle(self, timeout=None):
+        """Block until every queued save has been written (for scripts and tests)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        """Finish and sync the queued saves, then end the thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self.wait()
+
+    def run(self):
+        threading.current_thread().name = "image-writer"
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError) as e:
+            print(f"Could not lower image writer priority: {e}")
+        while True:
+            with self._cond:
+                if self._running and not self._pending:
+                    # Idle: sleep until the fsync batch falls due
+                    self._cond.wait(self.store.flush_due_in())
+                request = self._pending[0] if self._pending else None
+                running = self._running
+            if request is None:
+                # Outside the lock: an fsync must not hold up submit()
+                due = self.store.flush_due_in()
+                if not running or (due is not None and due <= 0):
+                    with tracing.span("storage_flush", category="io"):
+                        self.store.flush()
+                if not running:
+                    return
+                continue
+            with tracing.span("save_image", category="io"):
+                self._write(request)
+            request.frame = request.raw = None
+            with self._cond:
+                self._pending.popleft()
+                metrics.SAVE_QUEUE_DEPTH.dec()
+                self._cond.notify_all()
+            self.saved.emit(request)
+
+    def _write(self, request):
+        try:
+            base = self.store.allocate()
+            images = [("", request.frame)]
+            if request.raw is not None:
+                images.append(("_raw", request.raw))
+            for suffix, frame in images:
+                ok, data = cv2.imencode(self.extension,
+                                        prepare(frame, request.rotation, request.zoom),
+                                        self.params)
+                if not ok:
+                    raise ValueError(f"Could not encode {self.extension}")
+                path = f"{base}{suffix}{self.extension}"
+                self.store.write(path, data)
+                request.paths.append(path)
+            self.store.commit()
+            request.outcome = "saved"
+        except (OSError, ValueError, cv2.error) as e:
+            request.outcome = "failed"
+            request.error = str(e)
+            print(f"Error saving image: {e}")
+        request.finished_at = time.monotonic()
+
+
+def writer_from_env(parent=None):
+    """
+    VPISM_SAVE_FORMAT      png (default), jpeg or webp
+    VPISM_PNG_LEVEL        PNG compression 0-9 (default 3)
+    VPISM_JPEG_QUALITY     0-100 (default 95)
+    VPISM_WEBP_QUALITY     0-100 (default 90)
+    VPISM_WEBP_LOSSLESS    1 for lossless WebP
+    VPISM_SAVE_QUEUE       saves that may wait to be written (default 4)
+    Storage (folder, fsync policy): see storage.store_from_env().
+    """
+    return ImageWriter(
+        store=store_from_env(),
+        codec=settings.get_str("VPISM_SAVE_FORMAT", "png").lower(),
+        max_pending=settings.get_int("VPISM_SAVE_QUEUE", 4),
+        png_level=settings.get_int("VPISM_PNG_LEVEL", 3),
+        jpeg_quality=settings.get_int("VPISM_JPEG_QUALITY", 95),
+        webp_quality=settings.get_int("VPISM_WEBP_QUALITY", 90),
+        webp_lossless=settings.get_bool("VPISM_WEBP_LOSSLESS"),
+        parent=parent,
+    )
@@ -1,38 +1,150 @@
-try:
-    import RPi.GPIO as GPIO
-    _rpi = True
-except ImportError:
-    print("⚠️ RPi.GPIO not found — running in simulation mode.")
-    _rpi = False
-
-if _rpi:
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(18, GPIO.OUT)
-    pwm = GPIO.PWM(18, 1000)
-    pwm.start(0)
-else:
-    pwm = None
+import threading
+import time
+
+from vpism.logic import metrics, settings
+from vpism.logic.pwm import SimulatedPwm, open_pwm
+
+# LED on BCM 18 (hardware PWM0 with dtoverlay=pwm, see pwm.open_pwm)
+pwm = open_pwm("led", pin=18, frequency=1000)
+pwm.start(0)
+
+
+def _write_duty(percentage):
+    """The actual hardware write."""
+    pwm.set_duty(percentage)
+    if isinstance(pwm, SimulatedPwm):
+        print(f"[Simulated] Brightness set to {percentage:g}%")
+    metrics.LED_DUTY_CYCLE.set(percentage)
+
+
+# =========================
+# Brightness Controller
+# =========================
+class BrightnessController:
+    """
+    Coalesces brightness requests so a slider drag costs at most one PWM
+    write per `min_interval` (default: one display frame at 30 fps).
+
+    set() only records the target and returns. A background thread writes
+    the latest target: immediately if the last write is old enough,
+    otherwise at the end of the interval (trailing edge), so the final
+    value always lands. With ramp > 0 (seconds for a 0-100 sweep) it steps
+    towards the target at the write rate instead of jumping. Writes equal
+    to the current duty cycle are skipped. A failed write is logged and
+    retried after the interval.
+    """
+
+    def __init__(self, write=_write_duty, min_interval=1 / 30, ramp=0.0, duty=0):
+        self._write = write
+        self.min_interval = min_interval
+        self.ramp = ramp
+        self.duty = duty      # last value written to the hardware
+        self.target = duty    # latest requested value
+        self.requests = 0
+        self.writes = 0
+        self._last_write = 0.0
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = None
+
+    def set(self, percentage):
+        if not 0 <= percentage <= 100:
+            raise ValueError("Brightness must be between 0 and 100")
+        with self._cond:
+            self.requests += 1
+            self.target = percentage
+            self._cond.notify_all()
+            if self._thread is None and self._running:
+                self._thread = threading.Thread(target=self._run, name="brightness", daemon=True)
+                self._thread.start()
+
+    def wait_idle(self, timeout=None):
+        """Block until the target has been written (for scripts and tests)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.duty != self.target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self.target == self.duty:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                # Rate limit; requests arriving meanwhile just move the target
+                delay = self._last_write + self.min_interval - time.monotonic()
+                while self._running and delay > 0:
+                    self._cond.wait(delay)
+                    delay = self._last_write + self.min_interval - time.monotonic()
+                if not self._running:
+                    return
+                value = self._next_value(self.target)
+            written = True
+            if value != self.duty:
+                try:
+                    self._write(value)
+                    self.writes += 1
+                except Exception as e:
+                    print(f"Error setting brightness to {value:g}%: {e}")
+                    written = False
+            with self._cond:
+                if written:
+                    self.duty = value  # otherwise the same write is tried again
+                self._last_write = time.monotonic()
+                self._cond.notify_all()
+
+    def _next_value(self, target):
+        if self.ramp <= 0:
+            return target
+        step = 100 * self.min_interval / self.ramp
+        delta = max(-step, min(step, target - self.duty))
+        value = round(self.duty + delta, 1)
+        return target if abs(target - value) < 0.05 else value
+
+
+def _controller_from_env():
+    """
+    VPISM_LED_RATE_HZ    max PWM writes per second (default 30)
+    VPISM_LED_RAMP_MS    time for a full 0-100 ramp (default 0: jump)
+    """
+    rate = settings.get_float("VPISM_LED_RATE_HZ", 30.0)
+    if rate <= 0:
+        print(f"VPISM_LED_RATE_HZ must be positive, got {rate:g}; using 30")
+        rate = 30.0
+    ramp_ms = settings.get_float("VPISM_LED_RAMP_MS", 0.0)
+    return BrightnessController(min_interval=1 / rate, ramp=ramp_ms / 1000)
+
+
+controller = _controller_from_env()
 
 
 def set_brightness(percentage: int):
     """
-    Set LED brightness as a percentage (0–100).
+    Set LED brightness as a percentage (0–100). Returns at once; the
+    controller coalesces rapid changes into rate-limited PWM writes.
     Works on Raspberry Pi, simulates otherwise.
     """
-    if not 0 <= percentage <= 100:
-        raise ValueError("Brightness must be between 0 and 100")
+    controller.set(percentage)
 
-    if _rpi:
-        pwm.ChangeDutyCycle(percentage)
-    else:
-        print(f"[Simulated] Brightness set to {percentage}%")
 
 def cleanup():
     """
-    Stop PWM and clean up GPIO.
+    Stop the controller and release the PWM output.
     """
-    if _rpi:
-        pwm.stop()
-        GPIO.cleanup()
-    else:
+    controller.stop()
+    pwm.close()
+    if isinstance(pwm, SimulatedPwm):
         print("[Simulated] Cleanup complete")
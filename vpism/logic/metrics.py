@@ -0,0 +1,258 @@
+"""
+Process-wide metrics in the Prometheus text format, served on
+http://127.0.0.1:<VPISM_METRICS_PORT>/metrics (default 9109, 0 = off)
+from a background thread for a local collector to scrape.
+
+Counters and histograms are updated without locks: every thread writes
+to its own cell (created once per thread), and a scrape sums the cells.
+Values read during a scrape may therefore lag by an update or two.
+"""
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from vpism.logic import settings
+
+THERMAL_ZONE = "/sys/class/thermal/thermal_zone0/temp"
+# Seconds; frame stages are milliseconds, gallery loads can take seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REGISTRY = []
+
+
+def cpu_temperature():
+    """SoC temperature in °C, or None where the kernel does not report it."""
+    try:
+        with open(THERMAL_ZONE) as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def _format_value(value):
+    if value is None:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PerThread:
+    """Cells owned by one thread each; only the owner writes to its cell."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._local = threading.local()
+        self.cells = []
+
+    def cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = self._factory()
+            self.cells.append(cell)  # list.append is atomic
+            return cell
+
+
+# =========================
+# Instruments
+# =========================
+class Counter:
+    """Monotonic count; fn: read the value from elsewhere at scrape time."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, fn=None):
+        self.name = name
+        self.help = help
+        self._fn = fn
+        self._cells = PerThread(lambda: [0])
+        REGISTRY.append(self)
+
+    def inc(self, amount=1):
+        self._cells.cell()[0] += amount
+
+    def set_function(self, fn):
+        self._fn = fn
+
+    @property
+    def value(self):
+        if self._fn is not None:
+            return self._fn()
+        return sum(cell[0] for cell in list(self._cells.cells))
+
+    def samples(self):
+        yield self.name, (), self.value
+
+
+class Gauge:
+    """Current value, set directly or read from fn at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, fn=None):
+        self.name = name
+        self.help = help
+        self._fn = fn
+        self._value = 0
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, fn):
+        self._fn = fn
+
+    @property
+    def value(self):
+        return self._fn() if self._fn is not None else self._value
+
+    def samples(self):
+        yield self.name, (), self.value
+
+
+class Histogram:
+    """
+    Distribution of observed values (seconds) over fixed buckets.
+    labelnames: one child histogram per combination, via labels(...).
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, _HistogramChild(self.buckets))
+        return child
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, child in sorted(self._children.items()):
+            labels = tuple(zip(self.labelnames, values))
+            counts, total = child.totals()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", labels + (("le", le),), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # cell: bucket counts (+Inf last) followed by the sum
+        self._cells = PerThread(lambda: [0] * (len(buckets) + 1) + [0.0])
+
+    def observe(self, value):
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def totals(self):
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for cell in list(self._cells.cells):
+            for i in range(len(counts)):
+                counts[i] += cell[i]
+            total += cell[-1]
+        return counts, total
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# =========================
+# Device metrics
+# =========================
+FRAMES_CAPTURED = Counter("vpism_frames_captured_total", "Frames captured from the camera")
+FRAMES_PROCESSED = Counter("vpism_frames_processed_total", "Frames through mode processing")
+FRAMES_DISPLAYED = Counter("vpism_frames_displayed_total", "Frames shown on screen")
+FRAMES_DROPPED = Counter("vpism_frames_dropped_total",
+                         "Frames replaced before the GUI could show them")
+STAGE_SECONDS = Histogram("vpism_stage_seconds", "Time per frame in each pipeline stage",
+                          labelnames=("stage",))
+LATENCY_SECONDS = Histogram("vpism_capture_to_display_seconds",
+                            "Time from camera capture to the frame being shown")
+SAVE_QUEUE_DEPTH = Gauge("vpism_save_queue_depth", "Image saves not yet written")
+STORAGE_FLUSH_SECONDS = Histogram("vpism_storage_flush_seconds",
+                                  "Time to fsync a batch of saved images")
+STORAGE_DAMAGED = Counter("vpism_storage_damaged_total",
+                          "Partial image files set aside after an unclean shutdown")
+GALLERY_LOAD_SECONDS = Histogram("vpism_gallery_load_seconds",
+                                 "Time to load one day of saved images in the gallery")
+LED_DUTY_CYCLE = Gauge("vpism_led_duty_cycle_percent", "Illumination LED PWM duty cycle")
+SOC_TEMPERATURE = Gauge("vpism_soc_temperature_celsius", "SoC temperature",
+                        fn=cpu_temperature)
+
+
+# =========================
+# HTTP endpoint
+# =========================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per scrape is just noise
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread; returns the server (None on failure)."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Error starting metrics endpoint on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    return server
+
+
+def serve_from_env():
+    """VPISM_METRICS_PORT (default 9109, 0 disables)."""
+    port = settings.get_int("VPISM_METRICS_PORT", 9109)
+    return serve(port) if port else None
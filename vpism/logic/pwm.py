@@ -0,0 +1,199 @@
+"""
+PWM outputs for the LED and the buzzer, behind one small interface:
+
+    start(duty)  set_duty(percent)  set_frequency(hz)  stop()  close()
+
+Backends:
+  - SysfsPwm: a hardware PWM channel through /sys/class/pwm/pwmchipN.
+    Timed by the PWM peripheral, so it costs no CPU and does not jitter
+    when the video pipeline loads the cores. `root` can point at a fake
+    tree for testing.
+  - GpioPwm: RPi.GPIO software PWM on any pin (the previous behaviour).
+  - SimulatedPwm: records every change with a timestamp.
+
+open_pwm() picks one per device from the environment.
+"""
+import collections
+import os
+import time
+
+from vpism.logic import settings
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    print("⚠️ RPi.GPIO not found — running in simulation mode.")
+    GPIO = None
+
+SYSFS_ROOT = "/sys/class/pwm"
+
+
+# =========================
+# Sysfs (hardware PWM)
+# =========================
+class SysfsPwm:
+    """
+    Channel `channel` of /sys/class/pwm/pwmchip<chip>. The channel is
+    exported on open and unexported on close(). On a Raspberry Pi with
+    dtoverlay=pwm, chip 0 channel 0 is GPIO18.
+    """
+
+    def __init__(self, chip=0, channel=0, frequency=1000, root=SYSFS_ROOT, export_timeout=1.0):
+        self.chip_path = os.path.join(root, f"pwmchip{chip}")
+        self.path = os.path.join(self.chip_path, f"pwm{channel}")
+        self.channel = channel
+        self.duty = 0.0
+        self.period_ns = None
+        self._exported = False
+        if not os.path.isdir(self.chip_path):
+            raise OSError(f"No PWM chip at {self.chip_path}")
+        if not os.path.isdir(self.path):
+            self._write_chip("export", channel)
+            self._exported = True
+            # udev may need a moment to create the channel and fix permissions
+            deadline = time.monotonic() + export_timeout
+            while not os.access(os.path.join(self.path, "enable"), os.W_OK):
+                if time.monotonic() > deadline:
+                    raise OSError(f"PWM channel {self.path} did not appear after export")
+                time.sleep(0.01)
+        self.set_frequency(frequency)
+
+    def _write_chip(self, name, value):
+        with open(os.path.join(self.chip_path, name), "w") as f:
+            f.write(str(value))
+
+    def _write(self, name, value):
+        with open(os.path.join(self.path, name), "w") as f:
+            f.write(str(value))
+
+    def _duty_ns(self, percentage):
+        return int(self.period_ns * percentage / 100)
+
+    def start(self, duty=None):
+        if duty is not None:
+            self.set_duty(duty)
+        self._write("enable", 1)
+
+    def set_duty(self, percentage):
+        self._write("duty_cycle", self._duty_ns(percentage))
+        self.duty = percentage
+
+    def set_frequency(self, frequency):
+        period_ns = int(1e9 / frequency)
+        if period_ns == self.period_ns:
+            return
+        old_period, self.period_ns = self.period_ns, period_ns
+        # The kernel rejects duty_cycle > period, so shrink the duty first
+        if old_period is not None and period_ns < old_period:
+            self._write("duty_cycle", self._duty_ns(self.duty))
+            self._write("period", period_ns)
+        else:
+            self._write("period", period_ns)
+            self._write("duty_cycle", self._duty_ns(self.duty))
+
+    def stop(self):
+        self._write("enable", 0)
+
+    def close(self):
+        try:
+            self.stop()
+            if self._exported:
+                self._write_chip("unexport", self.channel)
+        except OSError as e:
+            print(f"Error releasing {self.path}: {e}")
+
+
+# =========================
+# RPi.GPIO (software PWM)
+# =========================
+class GpioPwm:
+    def __init__(self, pin, frequency=1000):
+        if GPIO is None:
+            raise RuntimeError("RPi.GPIO not available")
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.OUT)
+        self.pin = pin
+        self.pwm = GPIO.PWM(pin, frequency)
+        self.duty = 0.0
+
+    def start(self, duty=None):
+        if duty is not None:
+            self.duty = duty
+        self.pwm.start(self.duty)
+
+    def set_duty(self, percentage):
+        self.pwm.ChangeDutyCycle(percentage)
+        self.duty = percentage
+
+    def set_frequency(self, frequency):
+        self.pwm.ChangeFrequency(frequency)
+
+    def stop(self):
+        self.pwm.stop()
+
+    def close(self):
+        self.pwm.stop()
+        GPIO.cleanup(self.pin)
+
+
+# =========================
+# Simulated
+# =========================
+class SimulatedPwm:
+    """Keeps (time.monotonic(), event, value) of every change in `events`."""
+
+    def __init__(self, name="pwm", frequency=1000, history=500):
+        self.name = name
+        self.duty = 0.0
+        self.frequency = frequency
+        self.enabled = False
+        self.events = collections.deque(maxlen=history)
+
+    def _record(self, event, value=None):
+        self.events.append((time.monotonic(), event, value))
+
+    def start(self, duty=None):
+        if duty is not None:
+            self.duty = duty
+        self.enabled = True
+        self._record("start", self.duty)
+
+    def set_duty(self, percentage):
+        self.duty = percentage
+        self._record("duty", percentage)
+
+    def set_frequency(self, frequency):
+        self.frequency = frequency
+        self._record("frequency", frequency)
+
+    def stop(self):
+        self.enabled = False
+        self._record("stop")
+
+    def close(self):
+        self.stop()
+
+
+def open_pwm(name, pin, frequency=1000):
+    """
+    The PWM output for a device (name "led" or "buzzer", wired to BCM pin):
+
+    VPISM_PWM_BACKEND       auto (default), sysfs, gpio or sim
+    VPISM_<NAME>_PWM        sysfs chip:channel for the device, e.g.
+                            VPISM_LED_PWM=0:0; "auto" uses sysfs only
+                            when this is set
+    VPISM_PWM_SYSFS_ROOT    default /sys/class/pwm
+    """
+    backend = settings.get_str("VPISM_PWM_BACKEND", "auto")
+    channel = settings.get_str(f"VPISM_{name.upper()}_PWM")
+
+    if backend == "sysfs" or (backend == "auto" and channel):
+        chip, _, index = (channel or "0:0").partition(":")
+        try:
+            return SysfsPwm(int(chip), int(index or 0), frequency,
+                            root=settings.get_str("VPISM_PWM_SYSFS_ROOT", SYSFS_ROOT))
+        except OSError as e:
+            print(f"Hardware PWM for {name} unavailable, falling back: {e}")
+    if backend in ("gpio", "auto", "sysfs") and GPIO is not None:
+        return GpioPwm(pin, frequency)
+    return SimulatedPwm(name, frequency)
@@ -0,0 +1,161 @@
+import queue
+import threading
+from abc import abstractmethod
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from vpism.logic.camera_wrapper import CameraInterface, FramePacer, ModeMixin
+
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".bmp", ".gif"]
+
+
+# =========================
+# Replay Source (base)
+# =========================
+class ReplaySource(ModeMixin, CameraInterface):
+    """
+    Camera stand-in that replays recorded frames, for benchmarks and
+    regression runs without hardware.
+
+    Frames are decoded ahead of time on a background thread into a queue of
+    `prefetch` frames; capture() is paced to `fps` (None or 0: as fast as
+    possible) and, with loop=True, the recording restarts at the end.
+    Subclasses implement _frames(), a generator over one pass.
+    """
+
+    def __init__(self, mode="normal", rotation=0, fps=30, loop=True, prefetch=4):
+        ModeMixin.__init__(self, mode, rotation)
+        self.loop = loop
+        self.pacer = FramePacer(fps)
+        self._queue = queue.Queue(maxsize=max(1, prefetch))
+        self._running = True
+        self._finished = False
+        self._thread = None
+
+    def start(self):
+        """Start prefetching; called by subclasses once they are set up."""
+        self._thread = threading.Thread(target=self._prefetch_loop, name="prefetch", daemon=True)
+        self._thread.start()
+
+    @abstractmethod
+    def _frames(self):
+        """Generator over one pass of the recording."""
+        pass
+
+    def _prefetch_loop(self):
+        while self._running:
+            count = 0
+            for frame in self._frames():
+                count += 1
+                if not self._put(frame):
+                    return
+            if not self.loop or count == 0:
+                break
+        self._put(None)  # end of stream
+
+    def _put(self, item):
+        while self._running:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def capture(self, out=None):
+        if self._finished:
+            return False, None
+        self.pacer.wait()
+        frame = None
+        while self._running:
+            try:
+                frame = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                pass
+        if frame is None:
+            self._finished = True
+            return False, None
+        return True, frame
+
+    def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+
+# =========================
+# Video File Source
+# =========================
+class VideoFileSource(ReplaySource):
+    """Any file cv2.VideoCapture can decode (mp4, avi, mjpeg, ...)."""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = str(path)
+        self.start()
+
+    def _frames(self):
+        cap = cv2.VideoCapture(self.path)
+        try:
+            while self._running:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield frame
+        finally:
+            cap.release()
+
+
+# =========================
+# Image Folder Source
+# =========================
+class ImageFolderSource(ReplaySource):
+    """Every image in a directory, in file name order."""
+
+    def __init__(self, directory, **kwargs):
+        super().__init__(**kwargs)
+        self.files = sorted(
+            f for f in Path(directory).iterdir() if f.suffix.lower() in IMAGE_EXTENSIONS
+        )
+        self.start()
+
+    def _frames(self):
+        for file in self.files:
+            frame = cv2.imread(str(file), cv2.IMREAD_COLOR)
+            if frame is not None:
+                yield frame
+
+
+# =========================
+# Raw Recording Source
+# =========================
+class RawRecordingSource(ReplaySource):
+    """
+    Raw uint8 frames, memory-mapped rather than decoded:
+      - .npy: an array shaped (frames, height, width[, channels])
+      - anything else: headerless frames back to back; size=(w, h) and
+        channels (1 = grayscale, 3 = BGR) describe them
+    """
+
+    def __init__(self, path, size=None, channels=3, **kwargs):
+        super().__init__(**kwargs)
+        path = Path(path)
+        if path.suffix == ".npy":
+            self.frames = np.load(path, mmap_mode="r")
+        else:
+            if size is None:
+                raise ValueError("Raw recordings need the frame size")
+            w, h = size
+            shape = (h, w) if channels == 1 else (h, w, channels)
+            self.frames = np.memmap(path, dtype=np.uint8, mode="r").reshape((-1,) + shape)
+        self.start()
+
+    def _frames(self):
+        for frame in self.frames:
+            # Copy out of the mapping so the page cache work happens here,
+            # on the prefetch thread
+            yield np.array(frame)
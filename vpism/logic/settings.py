@@ -0,0 +1,188 @@
+"""
+Runtime configuration read from VPISM_* environment variables, so a
+device can be tuned without code changes. Unset variables fall back to
+the defaults given by the caller.
+"""
+import json
+import os
+
+import numpy as np
+
+
+def get_str(name, default=None):
+    value = os.environ.get(name)
+    return default if value in (None, "") else value
+
+
+def get_int(name, default=None):
+    value = get_str(name)
+    return default if value is None else int(value)
+
+
+def get_float(name, default=None):
+    value = get_str(name)
+    return default if value is None else float(value)
+
+
+def get_bool(name, default=False):
+    value = get_str(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_size(name, default=None):
+    """'WIDTHxHEIGHT' -> (width, height)"""
+    value = get_str(name)
+    if value is None:
+        return default
+    w, h = value.lower().split("x")
+    return int(w), int(h)
+
+
+# =========================
+# Camera
+# =========================
+def picamera2_options(size=(640, 480)):
+    """
+    VPISM_CAMERA_SIZE      main stream size, e.g. 800x480 (default: size,
+                           the display area when the GUI opens the camera)
+    VPISM_CAMERA_FORMAT    RGB888 or XRGB8888 (default RGB888)
+    VPISM_CAMERA_BUFFERS   libcamera buffer count (default: Picamera2's)
+    VPISM_CAMERA_FPS       fixed frame rate via FrameDurationLimits
+    VPISM_SENSOR_MODE      "auto" (pick from size/fps), a mode index, or "none"
+    """
+    sensor_mode = get_str("VPISM_SENSOR_MODE", "auto")
+    if sensor_mode.isdigit():
+        sensor_mode = int(sensor_mode)
+    elif sensor_mode == "none":
+        sensor_mode = None
+    return {
+        "size": get_size("VPISM_CAMERA_SIZE", size),
+        "format": get_str("VPISM_CAMERA_FORMAT", "RGB888"),
+        "buffer_count": get_int("VPISM_CAMERA_BUFFERS"),
+        "fps": get_float("VPISM_CAMERA_FPS"),
+        "sensor_mode": sensor_mode,
+    }
+
+
+def fake_picamera2_options():
+    """
+    Simulated camera for "picamera2:fake" (see fake_picamera2):
+    VPISM_FAKE_INTERVAL_MS   fixed frame interval (default: from the sensor mode)
+    VPISM_FAKE_JITTER_MS     standard deviation of frame delivery jitter
+    VPISM_FAKE_SCENE         image the fake sensor sees
+    """
+    interval = get_float("VPISM_FAKE_INTERVAL_MS")
+    return {
+        "frame_interval": interval / 1000 if interval else None,
+        "jitter": get_float("VPISM_FAKE_JITTER_MS", 0.0) / 1000,
+        "scene": get_str("VPISM_FAKE_SCENE"),
+    }
+
+
+def opencv_options():
+    """
+    Options for CameraWrapper (USB cameras through cv2.VideoCapture):
+    VPISM_CV_GRABBER       1 to grab on a background thread (newest frame wins)
+    VPISM_CV_BUFFERSIZE    CAP_PROP_BUFFERSIZE, e.g. 1
+    VPISM_CV_FOURCC        MJPG or YUYV
+    VPISM_CV_SIZE          e.g. 1280x720
+    VPISM_CV_FPS           requested frame rate
+    """
+    return {
+        "grabber": get_bool("VPISM_CV_GRABBER", False),
+        "buffer_size": get_int("VPISM_CV_BUFFERSIZE"),
+        "fourcc": get_str("VPISM_CV_FOURCC"),
+        "size": get_size("VPISM_CV_SIZE"),
+        "fps": get_float("VPISM_CV_FPS"),
+    }
+
+
+# =========================
+# Processing
+# =========================
+def workers():
+    """
+    VPISM_WORKERS   mode-processing threads (default 1). More than one
+                    processes frames in parallel and puts them back in
+                    capture order (see FramePipeline).
+    """
+    count = get_int("VPISM_WORKERS", 1)
+    if count < 1:
+        print(f"VPISM_WORKERS must be at least 1, got {count}; using 1")
+        count = 1
+    return count
+
+
+def blend_method():
+    """
+    VPISM_BLEND_METHOD   white-blend around the ROI: weighted (default) or
+                         lut, both exact (see VignetteCompositor). Measured
+                         with benchmarks/bench_apply_mode.py on x86 the
+                         weighted blend is 1.25x (normal) and 1.6x
+                         (inverted) faster than before, the LUT 0.8-1.0x;
+                         rerun it on the device to choose.
+    """
+    return get_str("VPISM_BLEND_METHOD", "weighted").lower()
+
+
+def vein_options():
+    """
+    Vein-mode enhancement (see VeinEnhancer); benchmarks/bench_vein.py
+    shows the speed/quality points to pick from per device:
+    VPISM_VEIN_ITERATIONS   CLAHE passes (default 2)
+    VPISM_VEIN_CLIP         CLAHE clip limit (default 4.0)
+    VPISM_VEIN_TILES        CLAHE tile grid, e.g. 8x8 (default 8x8)
+    VPISM_VEIN_TONE_CURVE   "auto" (fit to the 5-pass reference on the
+                            first vein frame, default), "off", or a .npy
+                            file holding a 256-entry LUT
+
+    The default is about a third of the cost of the original five passes
+    at clip 2 (1.6 vs 4.5 ms on a 384x384 ROI) at SSIM 0.84 against them;
+    VPISM_VEIN_ITERATIONS=5 VPISM_VEIN_CLIP=2 VPISM_VEIN_TONE_CURVE=off
+    restores the original output.
+    """
+    tone_curve = get_str("VPISM_VEIN_TONE_CURVE", "auto")
+    if tone_curve == "off":
+        tone_curve = None
+    elif tone_curve != "auto":
+        tone_curve = np.load(tone_curve)
+    return {
+        "iterations": get_int("VPISM_VEIN_ITERATIONS", 2),
+        "clip_limit": get_float("VPISM_VEIN_CLIP", 4.0),
+        "tile_grid": get_size("VPISM_VEIN_TILES", (8, 8)),
+        "tone_curve": tone_curve,
+    }
+
+
+# =========================
+# Persistent device state
+# =========================
+def state_path():
+    """VPISM_STATE_FILE (default: vpism_state.json next to saved_images)"""
+    return get_str("VPISM_STATE_FILE", "vpism_state.json")
+
+
+def load_state():
+    """Settings the device remembers across restarts (e.g. orientation)."""
+    try:
+        with open(state_path()) as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(**values):
+    """Merge values into the state file (written atomically)."""
+    state = load_state()
+    state.update(values)
+    path = state_path()
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error saving state: {e}")
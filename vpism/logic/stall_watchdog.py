@@ -0,0 +1,144 @@
+"""
+GUI event-loop stall detector.
+
+A heartbeat QTimer on the GUI thread stamps the time every `interval_ms`;
+a watcher thread checks the stamp, and when the loop is more than
+`threshold_ms` late it samples the GUI thread's Python stack. Each stall
+is reported when the loop recovers, naming the slot that was running
+(the frame the event loop called into) and its stack.
+
+The slot is found by depth: the heartbeat itself is called straight from
+the event loop, so it records how deep the loop's own Python stack is,
+and whatever sits at that depth during a stall is the slot.
+"""
+import collections
+import json
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QTimer, Qt
+
+from vpism.logic import metrics, settings
+
+GUI_STALLS = metrics.Counter("vpism_gui_stalls_total", "GUI event loop stalls over the threshold")
+GUI_STALL_SECONDS = metrics.Histogram("vpism_gui_stall_seconds", "Duration of GUI stalls")
+
+
+class StallWatchdog(QObject):
+    """
+    threshold_ms: report stalls longer than this.
+    log_path: also append each stall as a JSON line to this file.
+    max_samples: stack samples taken per stall (one every threshold_ms).
+    Reported stalls are kept in `stalls` (newest last).
+    """
+
+    def __init__(self, threshold_ms=100, interval_ms=20, log_path=None, max_samples=5,
+                 parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self.log_path = log_path
+        self.max_samples = max_samples
+        self.stalls = collections.deque(maxlen=100)
+
+        self._last_beat = time.monotonic()
+        self._base_depth = 0
+        self._gui_thread = None
+        self._running = False
+        self._thread = None
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._beat)
+
+    def start(self):
+        """Call from the GUI thread."""
+        self._gui_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self.timer.start()
+        self._running = True
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self.timer.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _beat(self):
+        # How deep the event loop's own Python stack is (everything below this slot)
+        depth = 0
+        frame = sys._getframe(1)
+        while frame is not None:
+            depth += 1
+            frame = frame.f_back
+        self._base_depth = depth
+        self._last_beat = time.monotonic()
+
+    # ----------------------------
+    # Watcher thread
+    # ----------------------------
+    def _watch(self):
+        stall = None
+        while self._running:
+            time.sleep(self.interval / 2)
+            beat = self._last_beat
+            if stall is None:
+                lag = time.monotonic() - beat - self.interval
+                if lag > self.threshold:
+                    stall = {"beat": beat, "samples": [self._sample()],
+                             "next": time.monotonic() + self.threshold}
+            elif beat != stall["beat"]:
+                self._report(stall, beat - stall["beat"] - self.interval)
+                stall = None
+            elif len(stall["samples"]) < self.max_samples and time.monotonic() >= stall["next"]:
+                stall["samples"].append(self._sample())
+                stall["next"] += self.threshold
+
+    def _sample(self):
+        """(slot, stack) of the GUI thread right now."""
+        frame = sys._current_frames().get(self._gui_thread)
+        if frame is None:
+            return "?", ""
+        stack = traceback.extract_stack(frame)
+        entry = stack[min(self._base_depth, len(stack) - 1)]
+        slot = f"{entry.name} ({entry.filename}:{entry.lineno})"
+        return slot, "".join(traceback.format_list(stack))
+
+    def _report(self, stall, duration):
+        slot, stack = stall["samples"][0]
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration * 1000.0, 1),
+            "slot": slot,
+            "stack": stack,
+            # Later samples show where the rest of the stall was spent
+            "later_slots": [s for s, _ in stall["samples"][1:]],
+        }
+        self.stalls.append(record)
+        GUI_STALLS.inc()
+        GUI_STALL_SECONDS.observe(duration)
+        print(f"GUI stall of {record['duration_ms']:.0f} ms in {slot}\n{stack}", end="")
+        if self.log_path:
+            try:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"Error writing stall log: {e}")
+
+
+def watchdog_from_env(parent=None):
+    """
+    VPISM_STALL_MS     report GUI stalls longer than this (default 100, 0 = off)
+    VPISM_STALL_LOG    append stalls as JSON lines to this file
+    """
+    threshold = settings.get_int("VPISM_STALL_MS", 100)
+    if not threshold:
+        return None
+    return StallWatchdog(threshold, log_path=settings.get_str("VPISM_STALL_LOG"), parent=parent)
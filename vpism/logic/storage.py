@@ -0,0 +1,255 @@
+"""
+Saved images on the SD card: saved_images/<YYYY-MM-DD>/image_N<suffix><ext>.
+
+- Numbering: each day folder keeps an index file (.index.json) with the
+  first number not known to be durable. The next free number is found
+  from there with a few stat calls instead of probing from image_1.
+- Atomic writes: data goes to .image_N.ext.tmp and is renamed into
+  place, so a saved file is either complete or absent.
+- fsync policy, trading durability against SD-card wear and latency:
+    always  fsync every file, its folder and the index on each save
+    batch   fsync the files written so far every `batch_size` saves or
+            `batch_interval` seconds, whichever comes first (default)
+    never   leave write-back to the kernel
+- Crash recovery: when a day is first used, files past the durable
+  mark are checked. Complete leftovers from an interrupted rename are
+  moved into place, other temp files deleted, and truncated images
+  renamed to *.partial (hidden from the gallery, but not deleted).
+"""
+import json
+import os
+import struct
+import time
+from datetime import datetime
+
+from vpism.logic import metrics, settings
+
+INDEX_FILE = ".index.json"
+POLICIES = ("always", "batch", "never")
+# Name variants of one capture: the processed frame and its raw frame
+SUFFIXES = ("", "_raw")
+EXTENSIONS = (".png", ".jpg", ".webp")
+
+
+def is_complete(path):
+    """Whether an image file ends where its format says it should."""
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            head = f.read(12)
+            f.seek(max(0, size - 12))
+            tail = f.read()
+    except OSError:
+        return False
+    if head.startswith(b"\x89PNG"):
+        return tail.endswith(b"IEND\xaeB`\x82")
+    if head.startswith(b"\xff\xd8"):
+        return tail.endswith(b"\xff\xd9")
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return struct.unpack("<I", head[4:8])[0] + 8 == size
+    return size > 0
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _Day:
+    """Numbering state of one day folder."""
+
+    def __init__(self, path):
+        self.path = path
+        self.synced = 1      # every number below this is durable
+        self.next = 1        # next number to hand out
+
+
+# =========================
+# Image Store
+# =========================
+class ImageStore:
+    """
+    Allocates file names and writes saved images. Not thread-safe: the
+    image writer thread is its only user.
+    """
+
+    def __init__(self, root="saved_images", policy="batch", batch_size=4, batch_interval=10.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown fsync policy: {policy}")
+        self.root = root
+        self.policy = policy
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._days = {}
+        self._unsynced = []       # files renamed into place but not fsynced
+        self._batched = 0         # saves since the last flush
+        self._first_unsynced = None
+        self.recovered = []       # (path, what was done) from crash recovery
+
+    # ----------------------------
+    # Numbering
+    # ----------------------------
+    def allocate(self):
+        """Path without extension of the next free image_N in today's folder."""
+        day = self._day(datetime.now().strftime("%Y-%m-%d"))
+        base = os.path.join(day.path, f"image_{day.next}")
+        day.next += 1
+        return base
+
+    def _day(self, date_str):
+        day = self._days.get(date_str)
+        if day is None:
+            day = _Day(os.path.join(self.root, date_str))
+            os.makedirs(day.path, exist_ok=True)
+            self._open_day(day)
+            self._days[date_str] = day
+        return day
+
+    def _open_day(self, day):
+        try:
+            with open(os.path.join(day.path, INDEX_FILE)) as f:
+                day.synced = int(json.load(f)["synced"])
+        except (OSError, ValueError, KeyError, TypeError):
+            # Folder from before the index: one scan, then never again
+            day.synced = self._scan_next(day.path)
+        day.next = day.synced
+        # Anything at or past the durable mark may be a leftover of a crash.
+        # Without fsync ordering a later file can survive an earlier one, so
+        # look one batch past the last hit
+        number, misses = day.synced, 0
+        while misses <= self.batch_size:
+            if self._recover(day.path, number):
+                day.next, misses = number + 1, 0
+            else:
+                misses += 1
+            number += 1
+        if day.next != day.synced or not os.path.exists(os.path.join(day.path, INDEX_FILE)):
+            day.synced = day.next
+            self._write_index(day, sync=self.policy != "never")
+
+    @staticmethod
+    def _scan_next(path):
+        highest = 0
+        for name in os.listdir(path):
+            stem = name.lstrip(".").split(".")[0]
+            if stem.startswith("image_"):
+                number = stem[len("image_"):].split("_")[0]
+                if number.isdigit():
+                    highest = max(highest, int(number))
+        return highest + 1
+
+    def _recover(self, path, number):
+        """Repair what a crash may have left of image_<number>; whether anything was there."""
+        found = False
+        for suffix in SUFFIXES:
+            for ext in EXTENSIONS:
+                name = f"image_{number}{suffix}{ext}"
+                final = os.path.join(path, name)
+                tmp = os.path.join(path, f".{name}.tmp")
+                if os.path.exists(tmp):
+                    found = True
+                    if not os.path.exists(final) and is_complete(tmp):
+                        os.replace(tmp, final)
+                        self.recovered.append((final, "renamed"))
+                    else:
+                        os.remove(tmp)
+                        self.recovered.append((tmp, "removed"))
+                if os.path.exists(final):
+                    found = True
+                    if not is_complete(final):
+                        os.replace(final, final + ".partial")
+                        self.recovered.append((final, "partial"))
+                        metrics.STORAGE_DAMAGED.inc()
+        return found
+
+    def _write_index(self, day, sync):
+        path = os.path.join(day.path, INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"synced": day.synced}, f)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if sync:
+            _fsync_path(day.path)
+
+    # ----------------------------
+    # Writing
+    # ----------------------------
+    def write(self, path, data):
+        """Write data to path via a temp file and rename."""
+        directory, name = os.path.split(path)
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                if self.policy == "always":
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        if self.policy == "batch":
+            self._unsynced.append(path)
+        if self._first_unsynced is None:
+            self._first_unsynced = time.monotonic()
+
+    def commit(self):
+        """Call after the files of one capture are written."""
+        self._batched += 1
+        if self.policy == "always" or self._batched >= self.batch_size:
+            self.flush()
+
+    def flush_due_in(self):
+        """Seconds until the batch interval runs out; None when nothing waits."""
+        if self._first_unsynced is None:
+            return None
+        return max(0.0, self._first_unsynced + self.batch_interval - time.monotonic())
+
+    def flush(self):
+        """Make everything written so far durable (per the policy) and record it."""
+        if self._first_unsynced is None:
+            return
+        started = time.perf_counter()
+        sync = self.policy != "never"
+        if sync:
+            for path in self._unsynced:
+                try:
+                    _fsync_path(path)
+                except OSError as e:
+                    print(f"Error syncing {path}: {e}")
+        for day in self._days.values():
+            if day.synced != day.next:
+                day.synced = day.next
+                try:
+                    # Also syncs the folder, which makes the renames durable
+                    self._write_index(day, sync)
+                except OSError as e:
+                    print(f"Error writing image index in {day.path}: {e}")
+        self._unsynced = []
+        self._batched = 0
+        self._first_unsynced = None
+        metrics.STORAGE_FLUSH_SECONDS.observe(time.perf_counter() - started)
+
+
+def store_from_env():
+    """
+    VPISM_SAVE_DIR            where saved images go (default saved_images)
+    VPISM_FSYNC               always, batch (default) or never
+    VPISM_FSYNC_BATCH         saves per fsync batch (default 4)
+    VPISM_FSYNC_INTERVAL_S    longest a save waits for its fsync (default 10)
+    """
+    return ImageStore(
+        root=settings.get_str("VPISM_SAVE_DIR", "saved_images"),
+        policy=settings.get_str("VPISM_FSYNC", "batch").lower(),
+        batch_size=settings.get_int("VPISM_FSYNC_BATCH", 4),
+        batch_interval=settings.get_float("VPISM_FSYNC_INTERVAL_S", 10.0),
+    )
@@ -0,0 +1,160 @@
+"""
+Span recording for frame pipeline investigations, exported as Chrome
+trace_event JSON (open in chrome://tracing or https://ui.perfetto.dev).
+
+    with tracing.span("convert"):
+        ...
+
+    @tracing.traced("update_image")
+    def update_image(self, qt_img): ...
+
+Spans go into a ring buffer holding the last `capacity` events, tagged
+with the recording thread, so a dump shows thread by thread where frames
+stalled. Recording is off unless VPISM_TRACE=1 (or enable() is called);
+while off, span() returns a shared no-op and traced() functions cost a
+single flag check.
+"""
+import collections
+import functools
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+
+from vpism.logic import settings
+
+_enabled = False
+_events = collections.deque(maxlen=20000)
+_thread_names = {}
+_pid = os.getpid()
+
+
+def enable(capacity=None):
+    """Start recording, keeping the last `capacity` spans."""
+    global _enabled, _events
+    if capacity is not None and capacity != _events.maxlen:
+        _events = collections.deque(_events, maxlen=capacity)
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def _record(name, category, start, end, args):
+    thread = threading.current_thread()
+    tid = thread.ident
+    if tid not in _thread_names:
+        _thread_names[tid] = thread.name
+    # deque.append is atomic, so recording threads need no lock
+    _events.append((name, category, start, end - start, tid, args))
+
+
+class _Span:
+    __slots__ = ("name", "category", "args", "start")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.category, self.start, time.perf_counter(), self.args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, category="frame", args=None):
+    """Context manager timing the enclosed block (a no-op while disabled)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+def traced(name=None, category="frame"):
+    """Decorator recording every call of a function as a span."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(label, category, start, time.perf_counter(), None)
+        return wrapper
+    return decorate
+
+
+# =========================
+# Export
+# =========================
+def trace_events():
+    """The recorded spans as Chrome trace_event dicts (timestamps in us)."""
+    events = [
+        {"name": "thread_name", "ph": "M", "pid": _pid, "tid": tid, "args": {"name": name}}
+        for tid, name in list(_thread_names.items())
+    ]
+    for name, category, start, duration, tid, args in list(_events):
+        event = {
+            "name": name, "cat": category, "ph": "X", "pid": _pid, "tid": tid,
+            "ts": start * 1e6, "dur": duration * 1e6,
+        }
+        if args:
+            event["args"] = args
+        events.append(event)
+    return events
+
+
+def dump(path=None):
+    """Write the ring buffer as trace JSON; returns the file written."""
+    if path is None:
+        directory = settings.get_str("VPISM_TRACE_DIR", "traces")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, datetime.now().strftime("trace-%Y%m%d-%H%M%S.json"))
+    try:
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace_events(), "displayTimeUnit": "ms"}, f)
+    except OSError as e:
+        print(f"Error writing trace: {e}")
+        return None
+    print(f"Trace written to: {path}")
+    return path
+
+
+def install_signal_handler(signum=getattr(signal, "SIGUSR1", None)):
+    """Dump a trace on a signal (default SIGUSR1: kill -USR1 <pid>)."""
+    if signum is None:
+        return
+    signal.signal(signum, lambda *_: dump())
+
+
+def configure_from_env():
+    """VPISM_TRACE=1 to record, VPISM_TRACE_EVENTS ring size (default 20000)."""
+    if settings.get_bool("VPISM_TRACE"):
+        enable(settings.get_int("VPISM_TRACE_EVENTS", 20000))
@@ -0,0 +1,193 @@
+import threading
+
+import cv2
+import numpy as np
+
+
+# =========================
+# Vein Enhancer
+# =========================
+class VeinEnhancer:
+    """
+    CLAHE contrast enhancement for vein mode, tunable at runtime.
+
+    The historical pipeline applies CLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    five times in a row. That stays the default here, as the quality
+    reference, but the cost can be traded down by:
+      - fewer iterations and/or a different clip limit / tile grid, or
+      - one CLAHE pass followed by a tone curve (256-entry LUT) fitted with
+        calibrate() so that a single pass approximates the 5x reference.
+    The app picks its configuration from settings.vein_options().
+    """
+
+    def __init__(self, clip_limit=2.0, tile_grid=(8, 8), iterations=5, tone_curve=None):
+        self._lock = threading.Lock()
+        self._calibration_lock = threading.Lock()
+        self._local = threading.local()
+        self._state = None
+        self.configure(clip_limit, tile_grid, iterations, tone_curve)
+
+    def configure(self, clip_limit=None, tile_grid=None, iterations=None, tone_curve=False):
+        """
+        Change parameters; None keeps the current value.
+        tone_curve: a (256,) uint8 LUT, None to disable it, False to keep it,
+        or "auto" to fit one with calibrate() on the next frame apply()'d.
+        """
+        with self._lock:
+            old = self._state or {}
+            clip_limit = old.get("clip_limit") if clip_limit is None else clip_limit
+            tile_grid = old.get("tile_grid") if tile_grid is None else tuple(tile_grid)
+            iterations = old.get("iterations") if iterations is None else iterations
+            calibrate = False
+            if tone_curve is False:
+                tone_curve = old.get("tone_curve")
+                calibrate = old.get("calibrate", False)
+            elif isinstance(tone_curve, str):
+                if tone_curve != "auto":
+                    raise ValueError(f"Unknown tone curve: {tone_curve}")
+                tone_curve, calibrate = None, True
+            elif tone_curve is not None:
+                tone_curve = np.asarray(tone_curve, dtype=np.uint8).reshape(1, 256)
+            if iterations < 0:
+                raise ValueError("iterations must be >= 0")
+
+            # The state dict is swapped as a whole so apply() never sees a
+            # half-updated configuration
+            self._state = {
+                "clip_limit": clip_limit,
+                "tile_grid": tile_grid,
+                "iterations": iterations,
+                "tone_curve": tone_curve,
+                "calibrate": calibrate,
+            }
+
+    def _clahe(self, state):
+        """CLAHE objects keep scratch buffers, so each thread gets its own."""
+        local = self._local
+        if getattr(local, "state", None) is not state:
+            local.state = state
+            local.clahe = cv2.createCLAHE(
+                clipLimit=state["clip_limit"], tileGridSize=state["tile_grid"]
+            )
+        return local.clahe
+
+    @property
+    def settings(self):
+        state = self._state
+        return {
+            "clip_limit": state["clip_limit"],
+            "tile_grid": state["tile_grid"],
+            "iterations": state["iterations"],
+            "tone_curve": state["tone_curve"] is not None,
+        }
+
+    def apply(self, gray, iterations=None, out=None):
+        """
+        Enhance a single-channel uint8 image.
+        out: destination array (may be a view); passes ping-pong between it
+        and a per-thread scratch buffer so nothing is allocated per call.
+        """
+        state = self._state
+        if state["calibrate"]:
+            state = self._calibrate_pending(gray, state)
+        if iterations is None:
+            iterations = state["iterations"]
+        clahe = self._clahe(state)
+        tone_curve = state["tone_curve"]
+
+        if out is None:
+            enhanced = gray
+            for _ in range(iterations):
+                enhanced = clahe.apply(enhanced)
+            if tone_curve is not None:
+                enhanced = cv2.LUT(enhanced, tone_curve)
+            return enhanced
+
+        steps = iterations + (tone_curve is not None)
+        if steps == 0:
+            out[...] = gray
+            return out
+        scratch = self._scratch(gray.shape)
+        src = gray
+        for step in range(steps):
+            # Alternate targets so that the last step lands in out
+            dst = out if (steps - step) % 2 == 1 else scratch
+            if step < iterations:
+                clahe.apply(src, dst=dst)
+            else:
+                cv2.LUT(src, tone_curve, dst=dst)
+            src = dst
+        return out
+
+    def _calibrate_pending(self, gray, state):
+        """tone_curve="auto": the first thread to get here fits the curve."""
+        with self._calibration_lock:
+            if self._state is state:
+                self.calibrate(gray, iterations=state["iterations"])
+        return self._state
+
+    def _scratch(self, shape):
+        local = self._local
+        scratch = getattr(local, "scratch", None)
+        if scratch is None or scratch.shape != shape:
+            scratch = local.scratch = np.empty(shape, dtype=np.uint8)
+        return scratch
+
+    def calibrate(self, gray, reference_iterations=5, iterations=1):
+        """
+        Fit a tone curve mapping `iterations` CLAHE passes onto the
+        `reference_iterations`-pass reference for this image, then switch
+        to it. Returns the fitted (256,) LUT.
+
+        The fit runs on a private CLAHE; iterations and curve are switched
+        in one configure(), so apply() on other threads never runs the new
+        pass count without its curve.
+        """
+        reference = reference_clahe(gray, reference_iterations)
+        state = self._state
+        clahe = cv2.createCLAHE(clipLimit=state["clip_limit"], tileGridSize=state["tile_grid"])
+        fast = gray
+        for _ in range(iterations):
+            fast = clahe.apply(fast)
+
+        # Mean reference value for every fast-path value, with the gaps
+        # interpolated and the curve kept monotonic
+        counts = np.bincount(fast.ravel(), minlength=256)
+        sums = np.bincount(fast.ravel(), weights=reference.ravel(), minlength=256)
+        seen = counts > 0
+        levels = np.arange(256)
+        curve = np.interp(levels, levels[seen], sums[seen] / counts[seen])
+        curve = np.maximum.accumulate(np.clip(np.rint(curve), 0, 255)).astype(np.uint8)
+
+        # Pin the CLAHE parameters the curve was fitted for
+        self.configure(state["clip_limit"], state["tile_grid"], iterations, curve)
+        return curve
+
+
+def reference_clahe(gray, iterations=5):
+    """The original 5x CLAHE(2.0, 8x8) output, used as the quality reference."""
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    enhanced = gray
+    for _ in range(iterations):
+        enhanced = clahe.apply(enhanced)
+    return enhanced
+
+
+def ssim(a, b):
+    """Mean structural similarity of two single-channel uint8 images."""
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+
+    def blur(img):
+        return cv2.GaussianBlur(img, (11, 11), 1.5)
+
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a * mu_a
+    var_b = blur(b * b) - mu_b * mu_b
+    cov = blur(a * b) - mu_a * mu_b
+    ssim_map = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / (
+        (mu_a * mu_a + mu_b * mu_b + c1) * (var_a + var_b + c2)
+    )
+    return float(ssim_map.mean())
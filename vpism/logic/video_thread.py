@@ -1,43 +1,198 @@
-from PyQt5.QtCore import QThread, pyqtSignal, Qt
+from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtGui import QImage
-import cv2
-from vpism.logic.camera_wrapper import CameraWrapper, ImageWrapper, Picamera2Wrapper
-import numpy as np
+import time
+import threading
+from vpism.logic import metrics, tracing
+from vpism.logic.camera_factory import open_camera
+from vpism.logic.camera_wrapper import VignetteCompositor
+from vpism.logic.buffer_pool import PooledImage
+from vpism.logic.display_transform import output_shape, transform_frame
+from vpism.logic.frame_mailbox import FrameMailbox
+from vpism.logic.frame_pipeline import FramePipeline
+from vpism.logic.frame_stats import LatencyTracker, RateMeter
 
 class VideoThread(QThread):
-    frame_signal = pyqtSignal(QImage)
+    # Emitted when the mailbox goes from empty to full; the receiver pulls
+    # the newest frame with take_frame() and must release() it once it has
+    # been drawn. Further frames posted before that overwrite the slot
+    # without another signal.
+    frame_ready = pyqtSignal()
 
-    def __init__(self, source=0):
+    def __init__(self, source=None, workers=1, camera=None, rotation=0, keep_raw=False,
+                 display_size=(640, 480), vein=None, blend_method=None):
+        """
+        source: camera spec for open_camera() (default: VPISM_SOURCE, else
+        the Pi camera); camera: an already opened CameraInterface instead.
+        keep_raw: also hold the unprocessed capture, for snapshot(raw=True).
+        display_size: initial (width, height) of the display area; the Pi
+        camera is configured to deliver frames at that size.
+        vein: VeinEnhancer.configure() options (see settings.vein_options).
+        blend_method: VignetteCompositor method (see settings.blend_method).
+        """
         super().__init__()
         self.running = True
-        self.camera = Picamera2Wrapper(source)
+        self.paused = False
+        if camera is None:
+            camera = open_camera(source, rotation=rotation, size=display_size)
+        else:
+            camera.set_rotation(rotation)
+        self.camera = camera
+        if vein:
+            self.configure_vein(**vein)
+        if blend_method is not None:
+            if blend_method not in VignetteCompositor.methods:
+                raise ValueError(f"Unknown blend method: {blend_method}")
+            self.camera.blend_method = blend_method
+        # Capture and mode processing run on their own threads; this thread
+        # is the display-conversion stage
+        self.pipeline = FramePipeline(self.camera, workers=workers, keep_raw=keep_raw)
+        self.pool = self.pipeline.pool
+
+        # (size, rotation, zoom) — replaced as a whole by the GUI thread.
+        # rotation and zoom are what the user asked for; the camera applies
+        # them itself and the display transform only covers what a frame lacks.
+        self.display = (tuple(display_size), rotation, 1.0)
+        self._display_dirty = False
+        self.last_frame = None  # processed frame held for re-rendering while paused
+        self.last_raw = None    # its raw capture, with keep_raw
+        # Guards swapping the held frame against snapshot() from the GUI thread
+        self._frame_lock = threading.Lock()
+        # (rotation, zoom) the camera had applied to the held frame, as
+        # stamped by the capture stage
+        self.last_frame_view = (rotation, 1.0)
+        self.mailbox = FrameMailbox(on_drop=self._drop_image)
+        # Capture-to-display latency and display rate, fed by the GUI when a
+        # frame is shown
+        self.latency = LatencyTracker()
+        self.display_rate = RateMeter()
+        # Per-stage times: capture/process (pipeline), convert (here), gui
+        self.timings = self.pipeline.timings
 
     def run(self):
+        threading.current_thread().name = "display"  # as shown in traces
+        self.pipeline.start()
         while self.running:
-            ret, frame = self.camera.read()
-            if ret and isinstance(frame, np.ndarray):
-                if len(frame.shape) == 2:
-                    h, w = frame.shape
-                    bytes_per_line = frame.strides[0]
-                    qt_img = QImage(frame.data, w, h, bytes_per_line, QImage.Format_Grayscale8)
-                else:
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if self.paused:
+                # Camera is idle; re-render the held frame if the view changed
+                if self._display_dirty and self.last_frame is not None:
+                    self._display_dirty = False
+                    # A re-render, not a fresh frame: no capture timestamp
+                    with tracing.span("rerender"):
+                        self.post(self.to_image(self.last_frame, *self.last_frame_view))
+                self.msleep(10)
+                continue
+
+            with tracing.span("wait_frame"):
+                item = self.pipeline.get(timeout=0.1)
+            if item is not None:
+                frame, captured_at, raw, view = item
+                with self._frame_lock:
+                    if self.last_frame is not None:
+                        self.pipeline.release(self.last_frame, self.last_raw)
+                    self.last_frame = frame
+                    self.last_raw = raw
+                    self.last_frame_view = view
+                started = time.perf_counter()
+                with tracing.span("convert"):
+                    image = self.to_image(frame, *self.last_frame_view)
+                self.timings.add("convert", time.perf_counter() - started)
+                image.captured_at = captured_at
+                self.post(image)
+
+    def post(self, image):
+        if self.mailbox.put(image):
+            self.frame_ready.emit()
+
+    @staticmethod
+    def _drop_image(image):
+        """Mailbox overwrite: count it and give the buffer back."""
+        metrics.FRAMES_DROPPED.inc()
+        image.release()
 
-                    if not frame.flags['C_CONTIGUOUS']:
-                        frame = np.ascontiguousarray(frame)
+    def take_frame(self):
+        """Newest PooledImage not yet shown, or None (GUI thread)."""
+        return self.mailbox.take()
 
-                    h, w, ch = frame.shape
-                    bytes_per_line = frame.strides[0]
-                    qt_img = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
+    @property
+    def dropped_frames(self):
+        return self.mailbox.dropped
 
-                qt_img = qt_img.scaled(640, 480, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    def snapshot(self, raw=False):
+        """
+        Copy of the held processed frame at full camera resolution, for
+        saving (GUI thread). Returns (frame, raw_frame, rotation, zoom) where
+        rotation/zoom are what the display still applies on top of the
+        frame, or None before the first frame. raw_frame is None unless
+        raw is set and the thread was created with keep_raw.
+        """
+        _, rotation, zoom = self.display
+        with self._frame_lock:
+            if self.last_frame is None:
+                return None
+            frame = self.last_frame.copy()
+            raw_frame = self.last_raw.copy() if raw and self.last_raw is not None else None
+            frame_rotation, frame_zoom = self.last_frame_view
+        return frame, raw_frame, (rotation - frame_rotation) % 360, max(1.0, zoom / frame_zoom)
 
-                self.frame_signal.emit(qt_img)
+    def to_image(self, frame, frame_rotation=0, frame_zoom=1.0):
+        """
+        Apply the display transform into a pooled buffer and wrap it as a
+        ready-to-paint QImage without copying. BGR frames use Format_BGR888
+        and BGRX frames Format_RGB32 (processing keeps X at 0xFF), so no
+        colour conversion is needed.
+        frame_rotation/frame_zoom: what the camera already applied to this
+        frame; only the remainder is done here (normally nothing, except
+        for a frame held while paused).
+        """
+        size, rotation, zoom = self.display
+        rotation = (rotation - frame_rotation) % 360
+        zoom = max(1.0, zoom / frame_zoom)
+        shape = output_shape(frame.shape, size, zoom)
+        # One being rendered, one waiting in the mailbox, one being drawn
+        self.pool.reserve(shape, 3)
+        buffer = self.pool.acquire(shape)
+        transform_frame(frame, size, rotation, zoom, out=buffer)
+
+        if len(buffer.shape) == 2:
+            h, w = buffer.shape
+            fmt = QImage.Format_Grayscale8
+        else:
+            h, w, ch = buffer.shape
+            fmt = QImage.Format_RGB32 if ch == 4 else QImage.Format_BGR888
+        qt_img = QImage(buffer.data, w, h, buffer.strides[0], fmt)
+        return PooledImage(qt_img, buffer, self.pool)
+
+    # ----------------------------
+    # Display parameters (GUI thread)
+    # ----------------------------
+    def set_display(self, size=None, rotation=None, zoom=None):
+        if zoom is not None:
+            # Sensor-side crop when available (Picamera2 ScalerCrop); frames
+            # that predate it are still cropped in software
+            self.camera.set_zoom(zoom)
+        if rotation is not None:
+            self.camera.set_rotation(rotation)
+        old_size, old_rotation, old_zoom = self.display
+        self.display = (
+            old_size if size is None else tuple(size),
+            old_rotation if rotation is None else rotation,
+            old_zoom if zoom is None else zoom,
+        )
+        self._display_dirty = True
+
+    def set_paused(self, paused):
+        self.paused = paused
+        self.pipeline.set_paused(paused)
 
     def switch_mode(self):
         self.camera.switch_mode()
 
+    def configure_vein(self, **kwargs):
+        """Retune vein enhancement (see VeinEnhancer.configure)."""
+        self.camera.vein_enhancer.configure(**kwargs)
+
     def stop(self):
         self.running = False
+        self.pipeline.stop()
         self.camera.release()
         self.wait()